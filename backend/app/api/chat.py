@@ -1,26 +1,32 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-import uuid
-from datetime import datetime
+import re
+from datetime import date, datetime
+from decimal import Decimal
 import time
 import orjson
-from typing import AsyncGenerator, Dict, Any
+from typing import AsyncGenerator
 
 from fastapi import APIRouter, Depends, HTTPException, Header
 from fastapi.responses import StreamingResponse
 
 from backend.app.api.deps import get_current_user
 from backend.app.schemas.chat import ChatRequest
-from backend.app.core.sse import sse_event, sse_stream
+from backend.app.core.sse import (
+    done_frame,
+    make_request_id,
+    sse_event,
+    sse_field_framer,
+    status_frame,
+)
 from backend.app.core.config import settings
 from backend.app.core.sqlite_store import (
     add_message,
-    add_message_artifact,
     upsert_conversation,
     get_messages,
-    get_conversation,
-    add_sql_audit,
+    finalize_chat_turn,
 )
 from backend.app.core.mysql import run_sql, extract_table_names, list_tables
 from backend.app.services.schema_context import build_schema_context
@@ -36,19 +42,41 @@ from backend.app.services.sql_assistant import (
 from backend.app.core.resilience import CircuitOpenError
 from backend.app.core.sqlite_store import list_file_uploads
 from backend.app.core.datasources import resolve_datasource
-from backend.app.core.uploads import cleanup_expired_uploads
 from backend.app.core.audit import mask_sensitive_rows
 
 router = APIRouter()
 log = logging.getLogger("chat")
 
+_WS = re.compile(r"\s+")
+# Titles are derived from at most this many leading characters of the question.
+_TITLE_SOURCE_CHARS = 200
+
 
 def _json_default(obj):
-    if isinstance(obj, (datetime,)):
+    # orjson encodes datetime/date/time natively; only other types reach this hook.
+    # Decimal (MySQL DECIMAL columns) is by far the most common, so test it first.
+    if type(obj) is Decimal:
+        return str(obj)
+    if isinstance(obj, (datetime, date)):  # subclasses, which orjson does not take
         return obj.isoformat()
     return str(obj)
 
 
+def _cancel_if_pending(task: asyncio.Task[str]) -> None:
+    # A disconnect or error before the side task is awaited must not leave it running unowned.
+    if not task.done():
+        task.cancel()
+
+
+async def _await_quietly(task: asyncio.Task[str]) -> str:
+    # Side LLM calls (explain/suggest) are best-effort; never let them abort the stream.
+    try:
+        return await task
+    except Exception:
+        log.warning("background llm task failed", exc_info=True)
+        return ""
+
+
 @router.post("/chat/sse")
 async def chat_sse(
     req: ChatRequest,
@@ -57,41 +85,51 @@ async def chat_sse(
 ):
     if not settings.has_llm_config:
         raise HTTPException(status_code=500, detail="LLM config missing (.env)")
-    # datasource config resolved below
-    await cleanup_expired_uploads()
+    # datasource config resolved below; expired uploads are cleaned up in the background
 
-    async def gen() -> AsyncGenerator[str, None]:
-        request_id = str(uuid.uuid4())
+    async def gen() -> AsyncGenerator[bytes, None]:
+        request_id = make_request_id()
+        rid_json = orjson.dumps(request_id)
 
         # Ensure conversation exists
-        await upsert_conversation(req.conversation_id, owner_username=user["username"])
+        conv = await upsert_conversation(req.conversation_id, owner_username=user["username"])
         user_msg_id = await add_message(req.conversation_id, "user", req.message)
+        # A default title is replaced with the question right away, so it shows while the
+        # turn streams and survives a turn that fails or is disconnected.
+        existing_title = (conv.get("title") or "").strip()
+        if not existing_title or existing_title in {"New Conversation", "新会话"}:
+            # Bounded input, one regex pass: no token list like " ".join(s.split()).
+            title = _WS.sub(" ", req.message[:_TITLE_SOURCE_CHARS]).strip()
+            if title and title != existing_title:
+                await finalize_chat_turn(req.conversation_id, title=title)
         yield sse_event("message", {"user_message_id": user_msg_id, "request_id": request_id})
-        conv = await get_conversation(req.conversation_id)
-        existing_title = (conv.get("title") or "").strip() if conv else ""
-        if conv and (not existing_title or existing_title in {"New Conversation", "新会话"}):
-            title = " ".join(req.message.strip().split())
-            if title:
-                await upsert_conversation(req.conversation_id, owner_username=user["username"], title=title)
-
-        # Build history (for SQL generation & analysis)
-        history_rows = await get_messages(req.conversation_id, limit=20)
-        history = [{"role": r["role"], "content": r["content"]} for r in history_rows if r["role"] in ("user","assistant")]
 
-        yield sse_event("status", {"stage": "schema_retrieval", "request_id": request_id})
+        yield status_frame("schema_retrieval", rid_json)
         ds_id, ds_cfg = await resolve_datasource(x_datasource_id)
         if not all([ds_cfg.get("host"), ds_cfg.get("database"), ds_cfg.get("user"), ds_cfg.get("password")]):
             raise HTTPException(status_code=500, detail="MySQL datasource config missing")
-        # Build allowed table scope (optional user-selected list)
-        try:
-            base_tables = await list_tables(ds_cfg, ds_id)
-        except Exception as e:
-            yield sse_event("error", {"message": str(e), "request_id": request_id, "where": "schema_tables"})
-            yield sse_event("done", {"ok": False, "request_id": request_id})
+        # Table list (MySQL), uploads and history (SQLite) are independent: fetch them together.
+        base_tables, uploads, history = await asyncio.gather(
+            list_tables(ds_cfg, ds_id),
+            list_file_uploads(user["username"], ds_id),
+            get_messages(req.conversation_id, limit=20, roles=("user", "assistant")),
+            return_exceptions=True,
+        )
+        if isinstance(base_tables, Exception):
+            yield sse_event(
+                "error",
+                {"message": str(base_tables), "request_id": request_id, "where": "schema_tables"},
+            )
+            yield done_frame(False, rid_json)
             return
-        uploads = await list_file_uploads(user["username"], ds_id)
+        for result in (base_tables, uploads, history):
+            if isinstance(result, BaseException):
+                raise result
+
+        # Build allowed table scope (optional user-selected list)
         upload_names = {u["table_name"] for u in uploads}
-        available_tables = {t["name"] for t in base_tables if not t["name"].startswith("tmp_")} | upload_names
+        available_tables = {n for t in base_tables if not (n := t["name"]).startswith("tmp_")}
+        available_tables |= upload_names
 
         requested_tables = {t for t in (req.allowed_tables or []) if t}
         if requested_tables:
@@ -106,15 +144,17 @@ async def chat_sse(
                         "tables": invalid,
                     },
                 )
-                yield sse_event("done", {"ok": False, "request_id": request_id})
+                yield done_frame(False, rid_json)
                 return
             allowed_tables = requested_tables
         else:
             allowed_tables = available_tables
+        # Folded once per request; the retry loop only diffs against this.
+        allowed_lc = frozenset(t.lower() for t in allowed_tables)
 
         schema_context = build_schema_context(req.message, ds_id, allowed_tables=allowed_tables)
 
-        yield sse_event("status", {"stage": "sql_generation", "request_id": request_id})
+        yield status_frame("sql_generation", rid_json)
         try:
             sql = await generate_sql(
                 req.message,
@@ -125,69 +165,90 @@ async def chat_sse(
             )
         except CircuitOpenError as e:
             yield sse_event("error", {"message": str(e), "request_id": request_id, "where": "llm_sql"})
-            yield sse_event("done", {"ok": False, "request_id": request_id})
+            yield done_frame(False, rid_json)
             return
         yield sse_event("sql", {"sql": sql, "request_id": request_id})
-        explain_text = await explain_sql(sql)
-        if explain_text:
-            yield sse_event("sql_explain", {"text": explain_text, "request_id": request_id})
-
-        # Enforce table allowlist to avoid cross-schema access.
+        # Explain the SQL while it executes; the result is emitted once execution settles.
+        explain_task = asyncio.create_task(explain_sql(sql))
+        try:
+            # Enforce table allowlist to avoid cross-schema access.
 
-        # Execute (retry: regenerate SQL if SQL error)
-        cols = []
-        rows = []
-        last_err: str | None = None
-        elapsed_ms = None
-        for attempt in range(settings.MAX_SQL_RETRY + 1):
-            try:
-                used_tables = set(extract_table_names(sql))
-                if used_tables and not used_tables.issubset(allowed_tables):
-                    last_err = "SQL references tables not allowed for this user."
+            # Execute (retry: regenerate SQL if SQL error)
+            cols = []
+            rows = []
+            last_err: str | None = None
+            elapsed_ms = None
+            for attempt in range(settings.MAX_SQL_RETRY + 1):
+                try:
+                    disallowed = extract_table_names(sql) - allowed_lc
+                    if disallowed:
+                        last_err = "SQL references tables not allowed for this user."
+                        yield sse_event(
+                            "error",
+                            {
+                                "message": last_err,
+                                "request_id": request_id,
+                                "where": "sql_allowlist",
+                                "tables": sorted(disallowed),
+                            },
+                        )
+                        break
                     yield sse_event(
-                        "error",
-                        {
-                            "message": last_err,
-                            "request_id": request_id,
-                            "where": "sql_allowlist",
-                            "tables": sorted(list(used_tables - allowed_tables)),
-                        },
+                        "status",
+                        {"stage": "sql_execution", "attempt": attempt, "request_id": request_id},
                     )
-                    break
-                yield sse_event("status", {"stage": "sql_execution", "attempt": attempt, "request_id": request_id})
-                t0 = time.perf_counter()
-                cols, rows = await run_sql(sql, max_rows=settings.MAX_ROWS, config=ds_cfg, cache_key=ds_id)
-                elapsed_ms = int((time.perf_counter() - t0) * 1000)
-                last_err = None
-                break
-            except CircuitOpenError as e:
-                last_err = str(e)
-                yield sse_event("error", {"message": last_err, "request_id": request_id, "where": "sql_execution"})
-                break
-            except Exception as e:
-                last_err = str(e)
-                yield sse_event("error", {"message": last_err, "request_id": request_id, "where": "sql_execution"})
-                if attempt >= settings.MAX_SQL_RETRY:
-                    break
-                # try to fix by asking LLM to rewrite SQL
-                fix_prompt = (
-                    "The SQL failed to run. Please rewrite a correct MySQL SELECT query. "
-                    "Only output SQL. "
-                    f"Error: {last_err}\nSQL: {sql}"
-                )
-                try:
-                    sql = await generate_sql(
-                        fix_prompt,
-                        schema_context,
-                        history,
-                        allowed_tables=sorted(list(allowed_tables)),
-                        table_lock=bool(req.table_lock),
+                    t0 = time.perf_counter_ns()
+                    cols, rows = await run_sql(
+                        sql, max_rows=settings.MAX_ROWS, config=ds_cfg, cache_key=ds_id
                     )
+                    elapsed_ms = (time.perf_counter_ns() - t0) // 1_000_000
+                    last_err = None
+                    break
                 except CircuitOpenError as e:
                     last_err = str(e)
-                    yield sse_event("error", {"message": last_err, "request_id": request_id, "where": "llm_sql"})
+                    yield sse_event(
+                        "error",
+                        {"message": last_err, "request_id": request_id, "where": "sql_execution"},
+                    )
                     break
-                yield sse_event("sql", {"sql": sql, "request_id": request_id, "note": "retry_rewrite"})
+                except Exception as e:
+                    last_err = str(e)
+                    yield sse_event(
+                        "error",
+                        {"message": last_err, "request_id": request_id, "where": "sql_execution"},
+                    )
+                    if attempt >= settings.MAX_SQL_RETRY:
+                        break
+                    # try to fix by asking LLM to rewrite SQL
+                    fix_prompt = (
+                        "The SQL failed to run. Please rewrite a correct MySQL SELECT query. "
+                        "Only output SQL. "
+                        f"Error: {last_err}\nSQL: {sql}"
+                    )
+                    try:
+                        sql = await generate_sql(
+                            fix_prompt,
+                            schema_context,
+                            history,
+                            allowed_tables=sorted(list(allowed_tables)),
+                            table_lock=bool(req.table_lock),
+                        )
+                    except CircuitOpenError as e:
+                        last_err = str(e)
+                        yield sse_event(
+                            "error",
+                            {"message": last_err, "request_id": request_id, "where": "llm_sql"},
+                        )
+                        break
+                    yield sse_event(
+                        "sql", {"sql": sql, "request_id": request_id, "note": "retry_rewrite"}
+                    )
+
+            explain_text = await _await_quietly(explain_task)
+        finally:
+            _cancel_if_pending(explain_task)
+        if explain_text:
+            yield sse_event("sql_explain", {"text": explain_text, "request_id": request_id})
 
         if last_err is not None:
             fix_text = await suggest_sql_fix(sql, last_err)
@@ -196,21 +257,23 @@ async def chat_sse(
             else:
                 yield sse_event("sql_fix", {"text": "无法自动修复，请检查 SQL 或调整问题描述。", "request_id": request_id})
             try:
-                await add_sql_audit(
-                    user_username=user["username"],
-                    conversation_id=req.conversation_id,
-                    message_id=user_msg_id,
-                    datasource_id=ds_id,
-                    sql_text=sql,
-                    row_count=None,
-                    elapsed_ms=elapsed_ms,
-                    success=False,
-                    error_message=last_err,
-                    slow=False,
+                await finalize_chat_turn(
+                    req.conversation_id,
+                    audit={
+                        "user_username": user["username"],
+                        "message_id": user_msg_id,
+                        "datasource_id": ds_id,
+                        "sql_text": sql,
+                        "row_count": None,
+                        "elapsed_ms": elapsed_ms,
+                        "success": False,
+                        "error_message": last_err,
+                        "slow": False,
+                    },
                 )
             except Exception:
-                pass
-            yield sse_event("done", {"ok": False, "request_id": request_id})
+                log.exception("failed to persist chat turn")
+            yield done_frame(False, rid_json)
             return
 
         cols, rows = mask_sensitive_rows(
@@ -219,7 +282,28 @@ async def chat_sse(
             keep_start=settings.SENSITIVE_MASK_KEEP_START,
             keep_end=settings.SENSITIVE_MASK_KEEP_END,
         )
-        yield sse_event("table", {"columns": cols, "rows": rows, "request_id": request_id, "row_count": len(rows)})
+        # Stream rows in bounded chunks. Each chunk is serialized once and the pieces are
+        # stitched back together for the artifact row, so nothing is encoded twice.
+        cols_json = orjson.dumps(cols, default=_json_default)
+        yield sse_event(
+            "table_schema",
+            {
+                "columns": orjson.Fragment(cols_json),
+                "row_count": len(rows),
+                "request_id": request_id,
+            },
+        )
+        chunk_size = max(1, settings.SSE_ROW_CHUNK)
+        row_parts: list[bytes] = []
+        for offset in range(0, len(rows), chunk_size):
+            part = orjson.dumps(rows[offset : offset + chunk_size], default=_json_default)
+            row_parts.append(part[1:-1])
+            yield sse_event(
+                "table_rows",
+                {"rows": orjson.Fragment(part), "offset": offset, "request_id": request_id},
+            )
+        rows_json = b"[" + b",".join(row_parts) + b"]"
+        yield sse_event("table_done", {"row_count": len(rows), "request_id": request_id})
         slow = bool(elapsed_ms is not None and elapsed_ms >= settings.SLOW_QUERY_THRESHOLD_MS)
         if slow:
             yield sse_event(
@@ -230,61 +314,79 @@ async def chat_sse(
         if safety_tips:
             yield sse_event("sql_safety", {"tips": safety_tips, "request_id": request_id})
 
-        yield sse_event("status", {"stage": "chart_generation", "request_id": request_id})
+        yield status_frame("chart_generation", rid_json)
         option = suggest_echarts_option(cols, rows)
-        if option:
-            yield sse_event("chart", {"echarts_option": option, "request_id": request_id})
+        chart_json = orjson.dumps(option, default=_json_default) if option else None
+        if chart_json:
+            yield sse_event(
+                "chart", {"echarts_option": orjson.Fragment(chart_json), "request_id": request_id}
+            )
         else:
             yield sse_event("chart", {"echarts_option": None, "request_id": request_id})
 
-        yield sse_event("status", {"stage": "analysis_generation", "request_id": request_id})
-        analysis_parts: list[str] = []
-        async for chunk in analyze_stream(req.message, sql, cols, rows):
-            analysis_parts.append(chunk)
-            yield sse_event("analysis", {"delta": chunk, "request_id": request_id})
-        analysis = "".join(analysis_parts).strip()
-        yield sse_event("analysis", {"text": analysis, "request_id": request_id, "done": True})
+        yield status_frame("analysis_generation", rid_json)
+        suggest_task = asyncio.create_task(
+            suggest_sql_improvement(req.message, sql, len(rows), elapsed_ms)
+        )
+        try:
+            analysis_parts: list[str] = []
+            analysis_delta = sse_field_framer("analysis", "delta", {"request_id": request_id})
+            # Coalesce token-sized deltas into fewer frames: flush at 64 chars or 40 ms.
+            pending: list[str] = []
+            pending_len = 0
+            last_flush = time.perf_counter()
+            async for chunk in analyze_stream(req.message, sql, cols, rows):
+                analysis_parts.append(chunk)
+                pending.append(chunk)
+                pending_len += len(chunk)
+                now = time.perf_counter()
+                if pending_len >= 64 or now - last_flush >= 0.04:
+                    yield analysis_delta("".join(pending))
+                    pending.clear()
+                    pending_len = 0
+                    last_flush = now
+            if pending:
+                yield analysis_delta("".join(pending))
+            analysis = "".join(analysis_parts).strip()
+            yield sse_event("analysis", {"text": analysis, "request_id": request_id, "done": True})
 
-        suggest_text = await suggest_sql_improvement(req.message, sql, len(rows), elapsed_ms)
+            suggest_text = await _await_quietly(suggest_task)
+        finally:
+            _cancel_if_pending(suggest_task)
         if suggest_text:
             yield sse_event("sql_suggest", {"text": suggest_text, "request_id": request_id})
 
         try:
-            await add_message_artifact(
-                conv_id=req.conversation_id,
-                user_message_id=user_msg_id,
-                sql_text=sql,
-                columns_json=orjson.dumps(cols, default=_json_default).decode("utf-8"),
-                rows_json=orjson.dumps(rows, default=_json_default).decode("utf-8"),
-                chart_json=orjson.dumps(option, default=_json_default).decode("utf-8") if option else None,
-                analysis_text=analysis,
-                explain_text=explain_text,
-                suggest_text=suggest_text,
-                safety_text="\n".join(safety_tips) if safety_tips else None,
-                fix_text=None,
-                view_json=None,
-            )
-        except Exception:
-            pass
-
-        try:
-            await add_sql_audit(
-                user_username=user["username"],
-                conversation_id=req.conversation_id,
-                message_id=user_msg_id,
-                datasource_id=ds_id,
-                sql_text=sql,
-                row_count=len(rows),
-                elapsed_ms=elapsed_ms,
-                success=True,
-                error_message=None,
-                slow=slow,
+            await finalize_chat_turn(
+                req.conversation_id,
+                artifact={
+                    "user_message_id": user_msg_id,
+                    "sql_text": sql,
+                    "columns_json": cols_json,
+                    "rows_json": rows_json,
+                    "chart_json": chart_json,
+                    "analysis_text": analysis,
+                    "explain_text": explain_text,
+                    "suggest_text": suggest_text,
+                    "safety_text": "\n".join(safety_tips) if safety_tips else None,
+                },
+                audit={
+                    "user_username": user["username"],
+                    "message_id": user_msg_id,
+                    "datasource_id": ds_id,
+                    "sql_text": sql,
+                    "row_count": len(rows),
+                    "elapsed_ms": elapsed_ms,
+                    "success": True,
+                    "error_message": None,
+                    "slow": slow,
+                },
+                assistant_content=f"[SQL]\n{sql}\n\n[Analysis]\n{analysis}",
             )
         except Exception:
-            pass
-
-        await add_message(req.conversation_id, "assistant", f"[SQL]\n{sql}\n\n[Analysis]\n{analysis}")
+            log.exception("failed to persist chat turn")
 
-        yield sse_event("done", {"ok": True, "request_id": request_id})
+        yield done_frame(True, rid_json)
 
-    return StreamingResponse(sse_stream(gen()), media_type="text/event-stream")
+    # gen() already yields bytes frames, which Starlette sends as-is (no re-encode, no copy).
+    return StreamingResponse(gen(), media_type="text/event-stream")
@@ -3,14 +3,14 @@ from __future__ import annotations
 import uuid
 from fastapi import APIRouter, Depends, HTTPException
 from backend.app.api.deps import get_current_user
+from backend.app.core.responses import ORJSONResponse
 from backend.app.schemas.chat import CreateConversationResponse
 from backend.app.core.sqlite_store import (
     upsert_conversation,
     list_conversations,
-    get_messages,
-    get_conversation,
-    delete_conversation,
-    get_message_artifact,
+    get_messages_if_owner,
+    delete_conversation_if_owner,
+    get_message_artifacts,
 )
 
 import orjson
@@ -19,7 +19,7 @@ router = APIRouter()
 
 @router.post("/conversations", response_model=CreateConversationResponse)
 async def create_conversation(user=Depends(get_current_user)):
-    conv_id = str(uuid.uuid4())
+    conv_id = uuid.uuid4().hex
     await upsert_conversation(conv_id, owner_username=user["username"])
     return CreateConversationResponse(conversation_id=conv_id)
 
@@ -29,40 +29,43 @@ async def get_conversations(user=Depends(get_current_user)):
 
 @router.get("/conversations/{conversation_id}/messages")
 async def conversation_messages(conversation_id: str, user=Depends(get_current_user)):
-    conv = await get_conversation(conversation_id)
-    if conv is None:
+    owner, messages = await get_messages_if_owner(conversation_id, user["username"], limit=50)
+    if owner is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    if conv["owner_username"] != user["username"]:
+    if owner != user["username"]:
         raise HTTPException(status_code=403, detail="Forbidden")
-    messages = await get_messages(conversation_id, limit=50)
+    artifacts = await get_message_artifacts(
+        conversation_id, [m["id"] for m in messages if m["role"] == "user"]
+    )
     for m in messages:
         if m["role"] != "user":
             continue
-        artifact = await get_message_artifact(conversation_id, m["id"])
+        artifact = artifacts.get(m["id"])
         if artifact:
-            try:
-                m["artifact"] = {
-                    "sql": artifact["sql_text"],
-                    "columns": orjson.loads(artifact["columns_json"]),
-                    "rows": orjson.loads(artifact["rows_json"]),
-                    "chart": orjson.loads(artifact["chart_json"]) if artifact["chart_json"] else None,
-                    "analysis": artifact.get("analysis_text"),
-                    "explain": artifact.get("explain_text"),
-                    "suggest": artifact.get("suggest_text"),
-                    "safety": artifact.get("safety_text"),
-                    "fix": artifact.get("fix_text"),
-                    "view": orjson.loads(artifact["view_json"]) if artifact.get("view_json") else None,
-                }
-            except Exception:
-                pass
-    return messages
+            # Stored artifact JSON was written by orjson; splice it in as-is rather than
+            # decoding it only for the response to re-encode it.
+            chart_json = artifact["chart_json"]
+            view_json = artifact.get("view_json")
+            m["artifact"] = {
+                "sql": artifact["sql_text"],
+                "columns": orjson.Fragment(artifact["columns_json"]),
+                "rows": orjson.Fragment(artifact["rows_json"]),
+                "chart": orjson.Fragment(chart_json) if chart_json else None,
+                "analysis": artifact.get("analysis_text"),
+                "explain": artifact.get("explain_text"),
+                "suggest": artifact.get("suggest_text"),
+                "safety": artifact.get("safety_text"),
+                "fix": artifact.get("fix_text"),
+                "view": orjson.Fragment(view_json) if view_json else None,
+            }
+    # Fragments are only understood by orjson, and the payload needs no jsonable_encoder walk.
+    return ORJSONResponse(messages)
 
 @router.delete("/conversations/{conversation_id}")
 async def remove_conversation(conversation_id: str, user=Depends(get_current_user)):
-    conv = await get_conversation(conversation_id)
-    if conv is None:
+    owner = await delete_conversation_if_owner(conversation_id, user["username"])
+    if owner is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    if conv["owner_username"] != user["username"]:
+    if owner != user["username"]:
         raise HTTPException(status_code=403, detail="Forbidden")
-    await delete_conversation(conversation_id)
     return {"ok": True}
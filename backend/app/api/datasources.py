@@ -1,14 +1,18 @@
 from __future__ import annotations
 
-import json
 import uuid
 from typing import Any, Dict
 
+import orjson
 from fastapi import APIRouter, Depends, HTTPException
 
 from backend.app.api.deps import get_current_user
-from backend.app.core.datasources import ensure_default_datasource
-from backend.app.core.mysql import ping, fetch_schema_documents
+from backend.app.core.datasources import (
+    datasource_config,
+    ensure_default_datasource,
+    invalidate_resolved_datasources,
+)
+from backend.app.core.mysql import fetch_schema_documents, invalidate_tables_cache, test_connection
 from backend.app.core.sqlite_store import (
     add_datasource,
     list_datasources,
@@ -18,11 +22,42 @@ from backend.app.core.sqlite_store import (
     list_qa_pairs,
 )
 from backend.app.core.training import get_store
-from backend.app.core.qa_docs import build_qa_doc
+from backend.app.core.qa_docs import build_qa_docs
+from backend.app.core.uploads import invalidate_available_tables
 
 router = APIRouter()
 
 
+async def _train_datasource(
+    ds_id: str, config: dict[str, Any], *, reset: bool = False
+) -> tuple[bool, str | None]:
+    """Load schema + enabled QA docs into the datasource's vector store and record the outcome."""
+    training_ok = True
+    training_error = None
+    if reset:
+        # A retrain is the user's way to pick up schema changes; drop cached table lists too.
+        invalidate_tables_cache(ds_id)
+        invalidate_available_tables()
+    try:
+        docs = await fetch_schema_documents(config, ds_id)
+        if docs:
+            store = get_store(ds_id)
+            if reset:
+                store.reset()
+            store.upsert_schema_docs(docs)
+            qa_docs = build_qa_docs(ds_id, await list_qa_pairs(ds_id))
+            if qa_docs:
+                store.upsert_qa_docs(qa_docs)
+        else:
+            training_ok = False
+            training_error = "No schema docs fetched"
+    except Exception as e:
+        training_ok = False
+        training_error = str(e)
+    await update_datasource_training(ds_id, training_ok, training_error)
+    return training_ok, training_error
+
+
 @router.get("/datasources")
 async def list_ds(user=Depends(get_current_user)):
     await ensure_default_datasource()
@@ -64,49 +99,11 @@ async def create_ds(payload: Dict[str, Any], user=Depends(get_current_user)):
         ds_id=ds_id,
         name=name,
         ds_type=ds_type,
-        config_json=json.dumps(config),
+        config_json=orjson.dumps(config).decode(),
         is_default=is_default,
     )
-    training_ok = True
-    training_error = None
-    try:
-        docs = await fetch_schema_documents(config, ds_id)
-        if docs:
-            store = get_store(ds_id)
-            store.upsert_schema_docs(docs)
-            qa_rows = await list_qa_pairs(ds_id)
-            qa_docs = []
-            for r in qa_rows:
-                if not r.get("enabled"):
-                    continue
-                try:
-                    tables = json.loads(r.get("tables_json") or "[]")
-                except Exception:
-                    tables = []
-                try:
-                    tags = json.loads(r.get("tags_json") or "[]")
-                except Exception:
-                    tags = []
-                qa_docs.append(
-                    build_qa_doc(
-                        r["id"],
-                        ds_id,
-                        r.get("question") or "",
-                        r.get("sql") or "",
-                        r.get("note"),
-                        tables,
-                        tags,
-                    )
-                )
-            if qa_docs:
-                store.upsert_qa_docs(qa_docs)
-        else:
-            training_ok = False
-            training_error = "No schema docs fetched"
-    except Exception as e:
-        training_ok = False
-        training_error = str(e)
-    await update_datasource_training(ds_id, training_ok, training_error)
+    invalidate_resolved_datasources()
+    training_ok, training_error = await _train_datasource(ds_id, config)
     return {"id": ds_id, "training_ok": training_ok, "training_error": training_error}
 
 
@@ -115,8 +112,8 @@ async def test_ds(ds_id: str, user=Depends(get_current_user)):
     ds = await get_datasource(ds_id)
     if ds is None:
         raise HTTPException(status_code=404, detail="Datasource not found")
-    config = json.loads(ds["config_json"])
-    ok = await ping(config, ds_id)
+    config = datasource_config(ds)
+    ok = await test_connection(config)
     if not ok:
         raise HTTPException(status_code=400, detail="Connection failed")
     return {"ok": True}
@@ -128,6 +125,7 @@ async def set_default(ds_id: str, user=Depends(get_current_user)):
     if ds is None:
         raise HTTPException(status_code=404, detail="Datasource not found")
     await set_default_datasource(ds_id)
+    invalidate_resolved_datasources()
     return {"ok": True}
 
 
@@ -136,46 +134,6 @@ async def train_ds(ds_id: str, user=Depends(get_current_user)):
     ds = await get_datasource(ds_id)
     if ds is None:
         raise HTTPException(status_code=404, detail="Datasource not found")
-    config = json.loads(ds["config_json"])
-    training_ok = True
-    training_error = None
-    try:
-        docs = await fetch_schema_documents(config, ds_id)
-        if docs:
-            store = get_store(ds_id)
-            store.reset()
-            store.upsert_schema_docs(docs)
-            qa_rows = await list_qa_pairs(ds_id)
-            qa_docs = []
-            for r in qa_rows:
-                if not r.get("enabled"):
-                    continue
-                try:
-                    tables = json.loads(r.get("tables_json") or "[]")
-                except Exception:
-                    tables = []
-                try:
-                    tags = json.loads(r.get("tags_json") or "[]")
-                except Exception:
-                    tags = []
-                qa_docs.append(
-                    build_qa_doc(
-                        r["id"],
-                        ds_id,
-                        r.get("question") or "",
-                        r.get("sql") or "",
-                        r.get("note"),
-                        tables,
-                        tags,
-                    )
-                )
-            if qa_docs:
-                store.upsert_qa_docs(qa_docs)
-        else:
-            training_ok = False
-            training_error = "No schema docs fetched"
-    except Exception as e:
-        training_ok = False
-        training_error = str(e)
-    await update_datasource_training(ds_id, training_ok, training_error)
+    config = datasource_config(ds)
+    training_ok, training_error = await _train_datasource(ds_id, config, reset=True)
     return {"ok": training_ok, "error": training_error}
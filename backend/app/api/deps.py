@@ -1,14 +1,14 @@
 from __future__ import annotations
 
 from fastapi import Header, HTTPException
-from backend.app.core.security import decode_access_token
+from backend.app.core.security import decode_access_token_cached
 
 async def get_current_user(authorization: str | None = Header(default=None)):
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Missing Authorization Bearer token")
     token = authorization.split(" ", 1)[1].strip()
     try:
-        payload = decode_access_token(token)
+        payload = await decode_access_token_cached(token)
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid token")
     username = payload.get("username") or payload.get("sub")
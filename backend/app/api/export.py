@@ -1,21 +1,57 @@
 from __future__ import annotations
 
-import io
+import asyncio
 import re
+import tempfile
 from urllib.parse import quote
-from typing import Any, Dict, List
+from typing import IO, Any, Iterator
 
-import pandas as pd
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
 
 from backend.app.api.deps import get_current_user
 
 router = APIRouter()
 
+_SPOOL_MAX_BYTES = 4 << 20
+_CHUNK_BYTES = 64 << 10
+
+
+def _iter_file(f: IO[bytes]) -> Iterator[bytes]:
+    try:
+        while chunk := f.read(_CHUNK_BYTES):
+            yield chunk
+    finally:
+        f.close()
+
+
+def _write_xlsx(columns: list[Any], rows: list[Any]) -> IO[bytes]:
+    """Encode rows into an xlsx file positioned at its start; runs off the event loop."""
+    width = len(columns)
+    for row in rows:
+        if not isinstance(row, list) or len(row) > width:
+            raise ValueError("row does not match columns")
+
+    # write_only streams rows into the sheet XML instead of holding a cell graph in memory.
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(columns)
+    for row in rows:
+        ws.append(row)
+    # Small workbooks stay in memory; large ones spill to disk instead of a growing BytesIO.
+    buf = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES)
+    try:
+        wb.save(buf)
+    except BaseException:
+        buf.close()
+        raise
+    buf.seek(0)
+    return buf
+
 
 @router.post("/export/xlsx")
-async def export_xlsx(payload: Dict[str, Any], user=Depends(get_current_user)):
+async def export_xlsx(payload: dict[str, Any], user=Depends(get_current_user)):
     columns = payload.get("columns")
     rows = payload.get("rows")
     filename = payload.get("filename") or "result.xlsx"
@@ -24,15 +60,10 @@ async def export_xlsx(payload: Dict[str, Any], user=Depends(get_current_user)):
     if len(columns) == 0:
         raise HTTPException(status_code=400, detail="No columns to export")
     try:
-        df = pd.DataFrame(rows, columns=columns)
-    except Exception as e:
+        buf = await asyncio.to_thread(_write_xlsx, columns, rows)
+    except (TypeError, ValueError) as e:
         raise HTTPException(status_code=400, detail=f"Invalid data: {e}") from e
 
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Sheet1")
-    buf.seek(0)
-
     if not filename.lower().endswith(".xlsx"):
         filename += ".xlsx"
     ascii_fallback = re.sub(r"[^\x20-\x7E]", "_", filename)
@@ -45,7 +76,7 @@ async def export_xlsx(payload: Dict[str, Any], user=Depends(get_current_user)):
         )
     }
     return StreamingResponse(
-        buf,
+        _iter_file(buf),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers=headers,
     )
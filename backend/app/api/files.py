@@ -1,12 +1,12 @@
 from __future__ import annotations
 
 import asyncio
-import io
-import json
+import os
 import re
 import uuid
-from typing import Dict, List
+from typing import IO, Any, Dict, List
 
+import orjson
 import pandas as pd
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, Header
 
@@ -14,7 +14,7 @@ from backend.app.api.deps import get_current_user
 from backend.app.core.config import settings
 from backend.app.core.mysql import drop_table, fetch_schema_documents_for_table, import_dataframe
 from backend.app.core.training import get_store
-from backend.app.core.uploads import cleanup_expired_uploads
+from backend.app.core.uploads import invalidate_available_tables, schedule_cleanup
 from backend.app.core.datasources import resolve_datasource
 from backend.app.core.sqlite_store import (
     add_file_upload,
@@ -32,7 +32,11 @@ def _normalize_columns(columns: List[str]) -> Dict[str, str]:
     out: Dict[str, str] = {}
     used: set[str] = set()
     for idx, col in enumerate(columns):
-        base = _SAFE_COL_RE.sub("_", (col or "").strip()).strip("_").lower()
+        base = (col or "").strip()
+        # Most headers are already [A-Za-z0-9_]; only run the regex on the rest.
+        if not (base.isascii() and base.replace("_", "a").isalnum()):
+            base = _SAFE_COL_RE.sub("_", base)
+        base = base.strip("_").lower()
         if not base:
             base = f"col_{idx+1}"
         if base[0].isdigit():
@@ -47,38 +51,88 @@ def _normalize_columns(columns: List[str]) -> Dict[str, str]:
     return out
 
 
-def _read_sheet_names(filename: str, data: bytes) -> List[str]:
+def _upload_file(file: UploadFile) -> IO[bytes]:
+    """The upload's spooled body, size-checked and rewound, without copying it into bytes."""
+    f = file.file
+    size = file.size
+    if size is None:
+        size = f.seek(0, os.SEEK_END)
+    if size > settings.FILE_UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=400, detail="File too large")
+    f.seek(0)
+    return f
+
+
+def _open_excel(data: IO[bytes]) -> pd.ExcelFile:
+    try:
+        data.seek(0)
+        return pd.ExcelFile(data, engine=settings.FILE_UPLOAD_EXCEL_ENGINE or None)
+    except ImportError as e:
+        msg = str(e)
+        if "xlrd" in msg.lower():
+            raise HTTPException(status_code=400, detail="Parsing .xls requires xlrd")
+        raise HTTPException(status_code=400, detail=f"Missing Excel dependency: {e}") from e
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid Excel file: {e}") from e
+
+
+def _read_sheet_names(filename: str, data: IO[bytes]) -> list[str]:
     if filename.lower().endswith(".csv"):
         return ["(csv)"]
     if filename.lower().endswith(".xlsx") or filename.lower().endswith(".xls"):
-        try:
-            excel = pd.ExcelFile(io.BytesIO(data))
-        except ImportError as e:
-            msg = str(e)
-            if "xlrd" in msg.lower():
-                raise HTTPException(status_code=400, detail="Parsing .xls requires xlrd")
-            raise HTTPException(status_code=400, detail=f"Missing Excel dependency: {e}") from e
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid Excel file: {e}") from e
-        return excel.sheet_names
+        return _open_excel(data).sheet_names
     raise HTTPException(status_code=400, detail="Unsupported file type. Use .xlsx/.xls/.csv")
 
 
-def _read_dataframe(filename: str, data: bytes, sheet_name: str | None) -> pd.DataFrame:
+def _read_dataframe(
+    filename: str, data: IO[bytes], sheet_name: str | None
+) -> tuple[pd.DataFrame, str | None]:
+    """Parse the upload and return it with the sheet actually read (the first one by default)."""
     if filename.lower().endswith(".csv"):
-        return pd.read_csv(io.BytesIO(data))
+        data.seek(0)
+        return pd.read_csv(data, engine=settings.FILE_UPLOAD_CSV_ENGINE or None), sheet_name
     if filename.lower().endswith(".xlsx") or filename.lower().endswith(".xls"):
+        # One ExcelFile serves both the sheet lookup and the parse.
+        excel = _open_excel(data)
         if sheet_name:
-            sheets = _read_sheet_names(filename, data)
-            if sheet_name not in sheets:
+            if sheet_name not in excel.sheet_names:
                 raise HTTPException(status_code=400, detail="Sheet not found in the file")
+        else:
+            sheet_name = excel.sheet_names[0] if excel.sheet_names else None
         try:
-            return pd.read_excel(io.BytesIO(data), sheet_name=sheet_name or 0)
+            return excel.parse(sheet_name or 0), sheet_name
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Failed to read Excel sheet: {e}") from e
     raise HTTPException(status_code=400, detail="Unsupported file type. Use .xlsx/.xls/.csv")
 
 
+def _prepare_and_import(
+    filename: str,
+    data: IO[bytes],
+    sheet_name: str | None,
+    table_name: str,
+    ds_cfg: dict[str, Any],
+    ds_id: str,
+) -> tuple[dict[str, str], list[str], int, str | None]:
+    """Parse, validate and import an upload; returns (col_map, columns, row_count, sheet)."""
+    df, effective_sheet = _read_dataframe(filename, data, sheet_name)
+    if df.empty:
+        raise HTTPException(status_code=400, detail="所选 Sheet 没有数据（只有表头）")
+    if df.shape[0] > settings.FILE_UPLOAD_MAX_ROWS:
+        raise HTTPException(status_code=400, detail="Too many rows")
+    if df.shape[1] > settings.FILE_UPLOAD_MAX_COLS:
+        raise HTTPException(status_code=400, detail="Too many columns")
+
+    col_map = _normalize_columns([str(c) for c in df.columns.tolist()])
+    df = df.rename(columns=col_map)
+
+    try:
+        import_dataframe(table_name, df, ds_cfg, ds_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Import failed: {e}") from e
+    return col_map, list(df.columns), int(df.shape[0]), effective_sheet
+
+
 @router.post("/files/upload")
 async def upload_file(
     file: UploadFile = File(...),
@@ -89,37 +143,18 @@ async def upload_file(
     if not file.filename:
         raise HTTPException(status_code=400, detail="Missing filename")
 
-    await cleanup_expired_uploads()
+    schedule_cleanup()
     ds_id, ds_cfg = await resolve_datasource(x_datasource_id)
 
-    raw = await file.read()
-    if len(raw) > settings.FILE_UPLOAD_MAX_BYTES:
-        raise HTTPException(status_code=400, detail="File too large")
-
-    effective_sheet = sheet_name
-    if file.filename.lower().endswith((".xlsx", ".xls")) and not sheet_name:
-        sheets = _read_sheet_names(file.filename, raw)
-        effective_sheet = sheets[0] if sheets else None
-
-    df = _read_dataframe(file.filename, raw, effective_sheet)
-    if df.empty:
-        raise HTTPException(status_code=400, detail="所选 Sheet 没有数据（只有表头）")
-    if df.shape[0] > settings.FILE_UPLOAD_MAX_ROWS:
-        raise HTTPException(status_code=400, detail="Too many rows")
-    if df.shape[1] > settings.FILE_UPLOAD_MAX_COLS:
-        raise HTTPException(status_code=400, detail="Too many columns")
-
-    col_map = _normalize_columns([str(c) for c in df.columns.tolist()])
-    df = df.rename(columns=col_map)
+    data = _upload_file(file)
 
     file_id = str(uuid.uuid4())
     table_name = f"tmp_{file_id.replace('-', '')}"
 
-    # pandas to_sql is sync, run in a worker thread
-    try:
-        await asyncio.to_thread(import_dataframe, table_name, df, ds_cfg, ds_id)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Import failed: {e}") from e
+    # Parsing, column normalization and pandas to_sql are all sync; run them in one worker thread.
+    col_map, columns, row_count, effective_sheet = await asyncio.to_thread(
+        _prepare_and_import, file.filename, data, sheet_name, table_name, ds_cfg, ds_id
+    )
 
     await add_file_upload(
         file_id=file_id,
@@ -128,9 +163,10 @@ async def upload_file(
         filename=file.filename,
         sheet_name=effective_sheet,
         table_name=table_name,
-        row_count=int(df.shape[0]),
-        columns_json=json.dumps(col_map, ensure_ascii=False),
+        row_count=row_count,
+        columns_json=orjson.dumps(col_map).decode(),
     )
+    invalidate_available_tables(user["username"], ds_id)
 
     # Update vector store with the new table schema for SQL generation
     try:
@@ -143,15 +179,15 @@ async def upload_file(
     return {
         "file_id": file_id,
         "table_name": table_name,
-        "row_count": int(df.shape[0]),
-        "columns": list(df.columns),
+        "row_count": row_count,
+        "columns": columns,
         "columns_map": col_map,
     }
 
 
 @router.get("/files")
 async def list_files(user=Depends(get_current_user), x_datasource_id: str | None = Header(default=None)):
-    await cleanup_expired_uploads()
+    schedule_cleanup()
     ds_id, _ = await resolve_datasource(x_datasource_id)
     return await list_file_uploads(user["username"], ds_id)
 
@@ -172,6 +208,7 @@ async def delete_file(file_id: str, user=Depends(get_current_user), x_datasource
         pass
 
     await delete_file_upload(file_id)
+    invalidate_available_tables(user["username"], meta.get("datasource_id") or "default")
     return {"ok": True}
 
 
@@ -180,9 +217,5 @@ async def list_sheets(file: UploadFile = File(...), user=Depends(get_current_use
     if not file.filename:
         raise HTTPException(status_code=400, detail="Missing filename")
 
-    raw = await file.read()
-    if len(raw) > settings.FILE_UPLOAD_MAX_BYTES:
-        raise HTTPException(status_code=400, detail="File too large")
-
-    sheets = _read_sheet_names(file.filename, raw)
+    sheets = _read_sheet_names(file.filename, _upload_file(file))
     return {"sheets": sheets}
@@ -1,23 +1,28 @@
 from __future__ import annotations
 
+import asyncio
 import uuid
-import json
 from typing import Dict, Any
 
-from fastapi import APIRouter, Depends, HTTPException, Header
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
 
 from backend.app.api.deps import get_current_user
 from backend.app.core.datasources import resolve_datasource
 from backend.app.core.mysql import validate_readonly_sql
+from backend.app.core.responses import ORJSONResponse, etag_json_response
 from backend.app.core.sqlite_store import (
     list_qa_pairs,
     add_qa_pair,
     update_qa_pair,
     delete_qa_pair,
     get_qa_pair,
+    get_qa_pairs,
+    set_qa_pairs_enabled,
+    delete_qa_pairs,
 )
 from backend.app.core.training import get_store
-from backend.app.core.qa_docs import build_qa_doc
+from backend.app.core.qa_docs import build_qa_doc, build_qa_docs, loads_safe
 
 router = APIRouter()
 
@@ -28,34 +33,31 @@ def _build_qa_doc(qa_id: str, ds_id: str, question: str, sql: str, note: str | N
 
 @router.get("/qa")
 async def list_qas(
+    request: Request,
     user=Depends(get_current_user),
     x_datasource_id: str | None = Header(default=None),
 ):
     ds_id, _ = await resolve_datasource(x_datasource_id)
     rows = await list_qa_pairs(ds_id)
-    out = []
-    for r in rows:
-        try:
-            tables = json.loads(r.get("tables_json") or "[]")
-        except Exception:
-            tables = []
-        try:
-            tags = json.loads(r.get("tags_json") or "[]")
-        except Exception:
-            tags = []
-        out.append(
+    # tables/tags are decoded (a corrupt or legacy value reads as []) rather than spliced
+    # in as Fragments, which orjson does not validate; the rest are plain str/int values,
+    # so the response still skips FastAPI's jsonable_encoder pass.
+    return etag_json_response(
+        request,
+        [
             {
-                "id": r.get("id"),
-                "question": r.get("question"),
-                "sql": r.get("sql"),
-                "note": r.get("note"),
-                "tables": tables,
-                "tags": tags,
-                "enabled": bool(r.get("enabled")),
-                "created_at": r.get("created_at"),
+                "id": r["id"],
+                "question": r["question"],
+                "sql": r["sql"],
+                "note": r["note"],
+                "tables": loads_safe(r["tables_json"]),
+                "tags": loads_safe(r["tags_json"]),
+                "enabled": bool(r["enabled"]),
+                "created_at": r["created_at"],
             }
-        )
-    return out
+            for r in rows
+        ]
+    )
 
 
 @router.post("/qa")
@@ -83,20 +85,23 @@ async def create_qa(
 
     ds_id, _ = await resolve_datasource(x_datasource_id)
     qa_id = str(uuid.uuid4())
-    await add_qa_pair(
-        qa_id,
-        ds_id,
-        question,
-        sql,
-        note,
-        json.dumps(tables, ensure_ascii=False),
-        json.dumps(tags, ensure_ascii=False),
-        enabled,
-    )
+    # Encoded once: stored as-is and echoed back in the response.
+    tables_json = orjson.dumps(tables).decode()
+    tags_json = orjson.dumps(tags).decode()
+    await add_qa_pair(qa_id, ds_id, question, sql, note, tables_json, tags_json, enabled)
     if enabled:
-        store = get_store(ds_id)
-        store.upsert_qa_docs([_build_qa_doc(qa_id, ds_id, question, sql, note, tables, tags)])
-    return {"id": qa_id, "question": question, "sql": sql, "tables": tables, "tags": tags, "enabled": enabled}
+        doc = _build_qa_doc(qa_id, ds_id, question, sql, note, tables, tags)
+        await asyncio.to_thread(get_store(ds_id).upsert_qa_docs, [doc])
+    return ORJSONResponse(
+        {
+            "id": qa_id,
+            "question": question,
+            "sql": sql,
+            "tables": orjson.Fragment(tables_json),
+            "tags": orjson.Fragment(tags_json),
+            "enabled": enabled,
+        }
+    )
 
 
 @router.put("/qa/{qa_id}")
@@ -124,32 +129,31 @@ async def update_qa(
         validate_readonly_sql(sql)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
-    if tables is None:
-        try:
-            tables = json.loads(row.get("tables_json") or "[]")
-        except Exception:
-            tables = []
-    if tags is None:
-        try:
-            tags = json.loads(row.get("tags_json") or "[]")
-        except Exception:
-            tags = []
-    if not isinstance(tables, list) or not isinstance(tags, list):
+    if (tables is not None and not isinstance(tables, list)) or (
+        tags is not None and not isinstance(tags, list)
+    ):
         raise HTTPException(status_code=400, detail="Tables/Tags must be lists")
+    # Lists the client did not send keep their stored JSON text as-is.
+    tables_json = row.get("tables_json") if tables is None else orjson.dumps(tables).decode()
+    tags_json = row.get("tags_json") if tags is None else orjson.dumps(tags).decode()
 
     await update_qa_pair(
         qa_id,
         question,
         sql,
         note,
-        json.dumps(tables, ensure_ascii=False),
-        json.dumps(tags, ensure_ascii=False),
+        tables_json,
+        tags_json,
         enabled,
     )
-    store = get_store(ds_id)
-    store.delete_qa_docs([qa_id])
+    docs = []
     if enabled:
-        store.upsert_qa_docs([_build_qa_doc(qa_id, ds_id, question, sql, note, tables, tags)])
+        if tables is None:
+            tables = loads_safe(tables_json)
+        if tags is None:
+            tags = loads_safe(tags_json)
+        docs.append(_build_qa_doc(qa_id, ds_id, question, sql, note, tables, tags))
+    await asyncio.to_thread(get_store(ds_id).replace_qa_docs, [qa_id], docs)
     return {"ok": True}
 
 
@@ -167,10 +171,41 @@ async def remove_qa(
         raise HTTPException(status_code=403, detail="QA not in current datasource")
     await delete_qa_pair(qa_id)
     store = get_store(ds_id)
-    store.delete_qa_docs([qa_id])
+    await asyncio.to_thread(store.delete_qa_docs, [qa_id])
     return {"ok": True}
 
 
+_BULK_CONCURRENCY = 32
+# Documents per vector-store upsert call (each call embeds its whole batch).
+_QA_UPSERT_BATCH = 64
+
+
+def _upsert_qa_docs_chunked(store: Any, docs: list[dict[str, Any]]) -> None:
+    for i in range(0, len(docs), _QA_UPSERT_BATCH):
+        store.upsert_qa_docs(docs[i : i + _QA_UPSERT_BATCH])
+
+
+def _validate_bulk_item(
+    item: dict[str, Any],
+) -> tuple[str, str, str, str | None, list, list, bool] | str:
+    """(qa_id, question, sql, note, tables, tags, enabled) for a valid item, else the error."""
+    question = (item.get("question") or "").strip()
+    sql = (item.get("sql") or "").strip()
+    note = (item.get("note") or "").strip() or None
+    tables = item.get("tables") or []
+    tags = item.get("tags") or []
+    enabled = bool(item.get("enabled", True))
+    if not question or not sql:
+        return "Question and SQL are required"
+    try:
+        validate_readonly_sql(sql)
+    except ValueError as e:
+        return str(e)
+    if not isinstance(tables, list) or not isinstance(tags, list):
+        return "Tables/Tags must be lists"
+    return str(uuid.uuid4()), question, sql, note, tables, tags, enabled
+
+
 @router.post("/qa/bulk")
 async def bulk_create_qa(
     payload: Dict[str, Any],
@@ -185,43 +220,50 @@ async def bulk_create_qa(
 
     ds_id, _ = await resolve_datasource(x_datasource_id)
     store = get_store(ds_id)
-    created = 0
     errors = []
-    qa_docs = []
+    valid = []
     for idx, item in enumerate(items):
-        question = (item.get("question") or "").strip()
-        sql = (item.get("sql") or "").strip()
-        note = (item.get("note") or "").strip() or None
-        tables = item.get("tables") or []
-        tags = item.get("tags") or []
-        enabled = bool(item.get("enabled", True))
-        if not question or not sql:
-            errors.append({"index": idx, "error": "Question and SQL are required"})
-            continue
-        try:
-            validate_readonly_sql(sql)
-        except ValueError as e:
-            errors.append({"index": idx, "error": str(e)})
-            continue
-        if not isinstance(tables, list) or not isinstance(tags, list):
-            errors.append({"index": idx, "error": "Tables/Tags must be lists"})
-            continue
-        qa_id = str(uuid.uuid4())
-        await add_qa_pair(
-            qa_id,
-            ds_id,
-            question,
-            sql,
-            note,
-            json.dumps(tables, ensure_ascii=False),
-            json.dumps(tags, ensure_ascii=False),
-            enabled,
-        )
-        if enabled:
-            qa_docs.append(build_qa_doc(qa_id, ds_id, question, sql, note, tables, tags))
-        created += 1
+        checked = _validate_bulk_item(item)
+        if isinstance(checked, str):
+            errors.append({"index": idx, "error": checked})
+        else:
+            valid.append(checked)
+
+    # Concurrent inserts land in the same SQLite group commit instead of one commit each.
+    sem = asyncio.Semaphore(_BULK_CONCURRENCY)
+
+    async def _insert(
+        qa_id: str,
+        question: str,
+        sql: str,
+        note: str | None,
+        tables: list,
+        tags: list,
+        enabled: bool,
+    ) -> None:
+        async with sem:
+            await add_qa_pair(
+                qa_id,
+                ds_id,
+                question,
+                sql,
+                note,
+                orjson.dumps(tables).decode(),
+                orjson.dumps(tags).decode(),
+                enabled,
+            )
+
+    await asyncio.gather(*[_insert(*v) for v in valid])
+    created = len(valid)
+    qa_docs = [
+        build_qa_doc(qa_id, ds_id, question, sql, note, tables, tags)
+        for qa_id, question, sql, note, tables, tags, enabled in valid
+        if enabled
+    ]
     if qa_docs:
-        store.upsert_qa_docs(qa_docs)
+        # Embedding + Chroma writes are blocking; keep them off the event loop, in
+        # bounded batches rather than one call for up to 500 documents.
+        await asyncio.to_thread(_upsert_qa_docs_chunked, store, qa_docs)
     return {"created": created, "errors": errors}
 
 
@@ -240,39 +282,19 @@ async def batch_update_qa(
 
     ds_id, _ = await resolve_datasource(x_datasource_id)
     store = get_store(ds_id)
-    updated = 0
-    for qa_id in ids:
-        row = await get_qa_pair(qa_id)
-        if not row:
-            continue
-        if row.get("datasource_id") != ds_id:
-            continue
-        if action == "delete":
-            await delete_qa_pair(qa_id)
-            store.delete_qa_docs([qa_id])
-            updated += 1
-            continue
-
+    rows = await get_qa_pairs(list(dict.fromkeys(ids)))
+    targets = [r for r in rows.values() if r.get("datasource_id") == ds_id]
+    target_ids = [r["id"] for r in targets]
+    if action == "delete":
+        await delete_qa_pairs(target_ids)
+        await asyncio.to_thread(store.delete_qa_docs, target_ids)
+    else:
         enabled = action == "enable"
-        try:
-            tables = json.loads(row.get("tables_json") or "[]")
-        except Exception:
-            tables = []
-        try:
-            tags = json.loads(row.get("tags_json") or "[]")
-        except Exception:
-            tags = []
-        await update_qa_pair(
-            qa_id,
-            row.get("question") or "",
-            row.get("sql") or "",
-            row.get("note"),
-            json.dumps(tables, ensure_ascii=False),
-            json.dumps(tags, ensure_ascii=False),
-            enabled,
-        )
-        store.delete_qa_docs([qa_id])
+        await set_qa_pairs_enabled(target_ids, enabled)
         if enabled:
-            store.upsert_qa_docs([build_qa_doc(qa_id, ds_id, row.get("question") or "", row.get("sql") or "", row.get("note"), tables, tags)])
-        updated += 1
+            docs = build_qa_docs(ds_id, [{**r, "enabled": 1} for r in targets])
+            await asyncio.to_thread(store.upsert_qa_docs, docs)
+        else:
+            await asyncio.to_thread(store.delete_qa_docs, target_ids)
+    updated = len(target_ids)
     return {"updated": updated}
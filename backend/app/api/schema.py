@@ -1,26 +1,28 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 
 from fastapi import Header
 from backend.app.api.deps import get_current_user
 from backend.app.core.mysql import list_tables, preview_table, preview_table_page
 from backend.app.core.sqlite_store import list_file_uploads, list_schema_change_logs, get_schema_snapshot
 from backend.app.core.resilience import CircuitOpenError
-from backend.app.core.uploads import cleanup_expired_uploads
+from backend.app.core.uploads import schedule_cleanup
 from backend.app.core.datasources import resolve_datasource
+from backend.app.core.responses import ORJSONResponse, etag_json_response
+from backend.app.core.qa_docs import loads_safe
 
 router = APIRouter()
 
 
 @router.get("/schema/tables")
 async def schema_tables(
+    request: Request,
     user=Depends(get_current_user),
     x_datasource_id: str | None = Header(default=None),
 ):
     try:
-        await cleanup_expired_uploads()
+        schedule_cleanup()
         ds_id, ds_cfg = await resolve_datasource(x_datasource_id)
         base = await list_tables(ds_cfg, ds_id)
         uploads = await list_file_uploads(user["username"], ds_id)
@@ -28,10 +30,8 @@ async def schema_tables(
         out = []
         for t in base:
             name = t["name"]
-            if name.startswith("tmp_") and name not in upload_map:
-                continue
-            if name in upload_map:
-                meta = upload_map[name]
+            meta = upload_map.get(name)
+            if meta is not None:
                 extra = meta.get("sheet_name") or ""
                 suffix = f" / {extra}" if extra else ""
                 t = {
@@ -39,8 +39,10 @@ async def schema_tables(
                     "type": "UPLOAD",
                     "comment": f"{meta['filename']}{suffix}",
                 }
+            elif name.startswith("tmp_"):
+                continue
             out.append(t)
-        return out
+        return etag_json_response(request, out)
     except CircuitOpenError as e:
         raise HTTPException(status_code=503, detail=str(e)) from e
 
@@ -55,7 +57,7 @@ async def schema_table_preview(
     x_datasource_id: str | None = Header(default=None),
 ):
     try:
-        await cleanup_expired_uploads()
+        schedule_cleanup()
         ds_id, ds_cfg = await resolve_datasource(x_datasource_id)
         if page is not None or page_size is not None:
             page = page or 1
@@ -67,17 +69,21 @@ async def schema_table_preview(
                 config=ds_cfg,
                 cache_key=ds_id,
             )
-            return {
-                "table": table_name,
-                "columns": cols,
-                "rows": rows,
-                "row_count": len(rows),
-                "total": total,
-                "page": page,
-                "page_size": page_size,
-            }
+            return ORJSONResponse(
+                {
+                    "table": table_name,
+                    "columns": cols,
+                    "rows": rows,
+                    "row_count": len(rows),
+                    "total": total,
+                    "page": page,
+                    "page_size": page_size,
+                }
+            )
         cols, rows = await preview_table(table_name, limit=limit, config=ds_cfg, cache_key=ds_id)
-        return {"table": table_name, "columns": cols, "rows": rows, "row_count": len(rows)}
+        return ORJSONResponse(
+            {"table": table_name, "columns": cols, "rows": rows, "row_count": len(rows)}
+        )
     except CircuitOpenError as e:
         raise HTTPException(status_code=503, detail=str(e)) from e
     except ValueError as e:
@@ -89,6 +95,7 @@ async def schema_table_preview(
 
 @router.get("/schema/changes")
 async def schema_changes(
+    request: Request,
     limit: int = Query(default=20, ge=1, le=100),
     user=Depends(get_current_user),
     x_datasource_id: str | None = Header(default=None),
@@ -96,27 +103,20 @@ async def schema_changes(
     ds_id, _ = await resolve_datasource(x_datasource_id)
     snapshot = await get_schema_snapshot(ds_id)
     logs = await list_schema_change_logs(ds_id, limit=limit)
-    out = []
-    for log in logs:
-        try:
-            out.append(
-                {
-                    "created_at": log.get("created_at"),
-                    "added": orjson.loads(log.get("added_json") or "[]"),
-                    "removed": orjson.loads(log.get("removed_json") or "[]"),
-                    "changed": orjson.loads(log.get("changed_json") or "[]"),
-                }
-            )
-        except Exception:
-            out.append(
-                {
-                    "created_at": log.get("created_at"),
-                    "added": [],
-                    "removed": [],
-                    "changed": [],
-                }
-            )
-    return {
-        "last_checked_at": snapshot.get("checked_at") if snapshot else None,
-        "logs": out,
-    }
+    # Each column is decoded on its own: a corrupt one reads as [] without blanking the rest.
+    out = [
+        {
+            "created_at": log["created_at"],
+            "added": loads_safe(log["added_json"]),
+            "removed": loads_safe(log["removed_json"]),
+            "changed": loads_safe(log["changed_json"]),
+        }
+        for log in logs
+    ]
+    return etag_json_response(
+        request,
+        {
+            "last_checked_at": snapshot.get("checked_at") if snapshot else None,
+            "logs": out,
+        }
+    )
@@ -1,40 +1,40 @@
 from __future__ import annotations
 
 import uuid
-import json
-from typing import List, Dict
+from typing import Dict
 
-from fastapi import APIRouter, Depends, HTTPException, Header
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
 
 from backend.app.api.deps import get_current_user
 from backend.app.core.sqlite_store import list_table_scopes, add_table_scope, delete_table_scope
 from backend.app.core.datasources import resolve_datasource
+from backend.app.core.responses import etag_json_response
+from backend.app.core.qa_docs import loads_safe
 
 router = APIRouter()
 
 
 @router.get("/scopes")
 async def list_scopes(
+    request: Request,
     user=Depends(get_current_user),
     x_datasource_id: str | None = Header(default=None),
 ):
     ds_id, _ = await resolve_datasource(x_datasource_id)
     scopes = await list_table_scopes(user["username"], ds_id)
-    out: List[Dict] = []
-    for s in scopes:
-        try:
-            tables = json.loads(s.get("tables_json") or "[]")
-        except Exception:
-            tables = []
-        out.append(
+    return etag_json_response(
+        request,
+        [
             {
-                "id": s.get("id"),
-                "name": s.get("name"),
-                "tables": tables,
-                "created_at": s.get("created_at"),
+                "id": s["id"],
+                "name": s["name"],
+                "tables": loads_safe(s["tables_json"]),
+                "created_at": s["created_at"],
             }
-        )
-    return out
+            for s in scopes
+        ]
+    )
 
 
 @router.post("/scopes")
@@ -53,7 +53,7 @@ async def create_scope(
         raise HTTPException(status_code=400, detail="Scope name too long")
     ds_id, _ = await resolve_datasource(x_datasource_id)
     scope_id = str(uuid.uuid4())
-    await add_table_scope(scope_id, user["username"], ds_id, name, json.dumps(tables, ensure_ascii=False))
+    await add_table_scope(scope_id, user["username"], ds_id, name, orjson.dumps(tables).decode())
     return {"id": scope_id, "name": name, "tables": tables}
 
 
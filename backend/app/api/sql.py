@@ -1,24 +1,29 @@
 from __future__ import annotations
 
-from datetime import datetime
+import asyncio
+from datetime import date, datetime
+from decimal import Decimal
+import logging
 import time
 import orjson
+from collections.abc import Coroutine
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Header
 
 from backend.app.api.deps import get_current_user
+from backend.app.core.responses import ORJSONResponse
 from backend.app.schemas.sql import SqlExecuteRequest
 from backend.app.core.config import settings
 from backend.app.core.sqlite_store import (
-    add_message_artifact,
+    finalize_chat_turn,
     get_conversation,
     get_message_by_id,
-    list_file_uploads,
     add_sql_audit,
 )
-from backend.app.core.mysql import run_sql, extract_table_names, list_tables
+from backend.app.core.mysql import run_sql, extract_table_names
 from backend.app.core.datasources import resolve_datasource
+from backend.app.core.uploads import available_tables as list_available_tables
 from backend.app.services.charting import suggest_echarts_option
 from backend.app.services.analyzer import analyze_stream
 from backend.app.core.audit import mask_sensitive_rows
@@ -29,14 +34,50 @@ from backend.app.services.sql_assistant import (
 )
 
 router = APIRouter()
+log = logging.getLogger("sql")
+
+# Post-response writes (artifact, audit); referenced here so they are not garbage-collected.
+_background: set[asyncio.Task] = set()
+
+
+def _persist_done(task: asyncio.Task) -> None:
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.error("persisting SQL result failed", exc_info=task.exception())
+
+
+def _persist_in_background(coro: Coroutine[Any, Any, None]) -> None:
+    """Run a SQLite write without holding the response on it."""
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_persist_done)
+
+
+async def drain_background_writes() -> None:
+    """Wait for pending post-response writes; called on shutdown before SQLite closes."""
+    if _background:
+        await asyncio.gather(*_background, return_exceptions=True)
 
 
 def _json_default(obj: Any):
-    if isinstance(obj, (datetime,)):
+    # orjson encodes datetime/date/time natively; only other types reach this hook.
+    # Decimal (MySQL DECIMAL columns) is by far the most common, so test it first.
+    if type(obj) is Decimal:
+        return str(obj)
+    if isinstance(obj, (datetime, date)):  # subclasses, which orjson does not take
         return obj.isoformat()
     return str(obj)
 
 
+async def _collect_analysis(question: str, sql: str, cols: list, rows: list) -> str:
+    parts = [chunk async for chunk in analyze_stream(question, sql, cols, rows)]
+    return "".join(parts).strip()
+
+
+async def _skipped() -> str:
+    return ""
+
+
 @router.post("/sql/execute")
 async def execute_sql(
     req: SqlExecuteRequest,
@@ -47,28 +88,36 @@ async def execute_sql(
     if not sql:
         raise HTTPException(status_code=400, detail="SQL is required")
 
-    conv = await get_conversation(req.conversation_id)
+    # The lookups are independent; run them together. Datasource errors are raised only
+    # after the ownership checks so an unauthorized caller still gets 404/403 first.
+    conv, msg, ds = await asyncio.gather(
+        get_conversation(req.conversation_id),
+        get_message_by_id(req.message_id),
+        resolve_datasource(x_datasource_id),
+        return_exceptions=True,
+    )
+    for res in (conv, msg):
+        if isinstance(res, BaseException):
+            raise res
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
     if conv.get("owner_username") != user["username"]:
         raise HTTPException(status_code=403, detail="Forbidden")
 
-    msg = await get_message_by_id(req.message_id)
     if not msg or msg.get("conversation_id") != req.conversation_id:
         raise HTTPException(status_code=400, detail="Message not found in conversation")
     if msg.get("role") != "user":
         raise HTTPException(status_code=400, detail="Only user messages can be re-run")
 
-    ds_id, ds_cfg = await resolve_datasource(x_datasource_id)
+    if isinstance(ds, BaseException):
+        raise ds
+    ds_id, ds_cfg = ds
     if not all([ds_cfg.get("host"), ds_cfg.get("database"), ds_cfg.get("user"), ds_cfg.get("password")]):
         raise HTTPException(status_code=500, detail="MySQL datasource config missing")
 
     # Enforce table allowlist (base tables + user uploads), optionally scoped by user.
-    base_tables = await list_tables(ds_cfg, ds_id)
-    uploads = await list_file_uploads(user["username"], ds_id)
-    upload_names = {u["table_name"] for u in uploads}
-    available_tables = {t["name"] for t in base_tables if not t["name"].startswith("tmp_")} | upload_names
-    requested_tables = {t for t in (req.allowed_tables or []) if t}
+    available_tables = await list_available_tables(user["username"], ds_id, ds_cfg)
+    requested_tables = frozenset(t for t in (req.allowed_tables or []) if t)
     if requested_tables:
         invalid = sorted(list(requested_tables - available_tables))
         if invalid:
@@ -76,17 +125,16 @@ async def execute_sql(
         allowed_tables = requested_tables
     else:
         allowed_tables = available_tables
-    used_tables = set(extract_table_names(sql))
-    if used_tables and not used_tables.issubset(allowed_tables):
+    if extract_table_names(sql) - frozenset(t.lower() for t in allowed_tables):
         raise HTTPException(
             status_code=400,
             detail="SQL references tables not allowed for this user.",
         )
 
     try:
-        t0 = time.perf_counter()
+        t0 = time.perf_counter_ns()
         cols, rows = await run_sql(sql, max_rows=settings.MAX_ROWS, config=ds_cfg, cache_key=ds_id)
-        elapsed_ms = int((time.perf_counter() - t0) * 1000)
+        elapsed_ms = (time.perf_counter_ns() - t0) // 1_000_000
     except ValueError as e:
         try:
             await add_sql_audit(
@@ -121,8 +169,7 @@ async def execute_sql(
         except Exception:
             pass
         raise HTTPException(status_code=500, detail=str(e))
-    option = suggest_echarts_option(cols, rows)
-    explain_text = await explain_sql(sql)
+    option = suggest_echarts_option(cols, rows) if req.with_chart else None
 
     cols, rows = mask_sensitive_rows(
         cols,
@@ -133,61 +180,67 @@ async def execute_sql(
     slow = bool(elapsed_ms is not None and elapsed_ms >= settings.SLOW_QUERY_THRESHOLD_MS)
     safety_tips = generate_safety_tips(sql, len(rows), elapsed_ms)
 
-    analysis = ""
-    if req.with_analysis:
-        if not settings.has_llm_config:
-            raise HTTPException(status_code=500, detail="LLM config missing (.env)")
-        analysis_parts: list[str] = []
-        async for chunk in analyze_stream(msg.get("content") or "", sql, cols, rows):
-            analysis_parts.append(chunk)
-        analysis = "".join(analysis_parts).strip()
-
-    suggest_text = await suggest_sql_improvement(msg.get("content") or "", sql, len(rows), elapsed_ms)
+    if req.with_analysis and not settings.has_llm_config:
+        raise HTTPException(status_code=500, detail="LLM config missing (.env)")
+    # The LLM calls are independent of each other; wait for the slowest, not their sum.
+    question = msg.get("content") or ""
+    explain_text, suggest_text, analysis = await asyncio.gather(
+        explain_sql(sql),
+        (
+            suggest_sql_improvement(question, sql, len(rows), elapsed_ms)
+            if req.with_suggest
+            else _skipped()
+        ),
+        _collect_analysis(question, sql, cols, rows) if req.with_analysis else _skipped(),
+    )
 
-    try:
-        await add_message_artifact(
-            conv_id=req.conversation_id,
-            user_message_id=req.message_id,
-            sql_text=sql,
-            columns_json=orjson.dumps(cols, default=_json_default).decode("utf-8"),
-            rows_json=orjson.dumps(rows, default=_json_default).decode("utf-8"),
-            chart_json=orjson.dumps(option, default=_json_default).decode("utf-8") if option else None,
-            analysis_text=analysis,
-            explain_text=explain_text,
-            suggest_text=suggest_text,
-            safety_text="\n".join(safety_tips) if safety_tips else None,
-            fix_text=None,
-            view_json=orjson.dumps(req.view).decode("utf-8") if req.view else None,
+    # Encode the result once: the same bytes are stored in the artifact and spliced into
+    # the response, instead of the response encoder walking the rows a second time.
+    cols_json = orjson.dumps(cols, default=_json_default)
+    rows_json = orjson.dumps(rows, default=_json_default)
+    chart_json = orjson.dumps(option, default=_json_default) if option else None
+
+    # Artifact and success audit go in one transaction (one commit instead of two).
+    _persist_in_background(
+        finalize_chat_turn(
+            req.conversation_id,
+            artifact={
+                "user_message_id": req.message_id,
+                "sql_text": sql,
+                "columns_json": cols_json,
+                "rows_json": rows_json,
+                "chart_json": chart_json,
+                "analysis_text": analysis,
+                "explain_text": explain_text,
+                "suggest_text": suggest_text,
+                "safety_text": "\n".join(safety_tips) if safety_tips else None,
+                "view_json": orjson.dumps(req.view) if req.view else None,
+            },
+            audit={
+                "user_username": user["username"],
+                "message_id": req.message_id,
+                "datasource_id": ds_id,
+                "sql_text": sql,
+                "row_count": len(rows),
+                "elapsed_ms": elapsed_ms,
+                "success": True,
+                "slow": slow,
+            },
         )
-    except Exception:
-        pass
+    )
 
-    try:
-        await add_sql_audit(
-            user_username=user["username"],
-            conversation_id=req.conversation_id,
-            message_id=req.message_id,
-            datasource_id=ds_id,
-            sql_text=sql,
-            row_count=len(rows),
-            elapsed_ms=elapsed_ms,
-            success=True,
-            error_message=None,
-            slow=slow,
-        )
-    except Exception:
-        pass
-
-    return {
-        "sql": sql,
-        "columns": cols,
-        "rows": rows,
-        "chart": option,
-        "analysis": analysis,
-        "elapsed_ms": elapsed_ms,
-        "slow": slow,
-        "explain": explain_text,
-        "suggest": suggest_text,
-        "safety": safety_tips,
-        "view": req.view,
-    }
+    return ORJSONResponse(
+        {
+            "sql": sql,
+            "columns": orjson.Fragment(cols_json),
+            "rows": orjson.Fragment(rows_json),
+            "chart": orjson.Fragment(chart_json) if chart_json else None,
+            "analysis": analysis,
+            "elapsed_ms": elapsed_ms,
+            "slow": slow,
+            "explain": explain_text,
+            "suggest": suggest_text,
+            "safety": safety_tips,
+            "view": req.view,
+        }
+    )
@@ -1,9 +1,26 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+import functools
+import re
+from typing import Any, Callable, List, Tuple
 
 from backend.app.core.config import settings
 
+_MISSING = object()
+
+
+@functools.lru_cache(maxsize=8)
+def _keyword_re(keywords: tuple[str, ...]) -> re.Pattern[str]:
+    """One alternation over all keywords, so a column name is checked in a single scan."""
+    return re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def _sensitive_indices(columns: tuple[str, ...], keywords: tuple[str, ...]) -> tuple[int, ...]:
+    """Positions of the sensitive columns; re-runs of the same query reuse the scan."""
+    keyword_re = _keyword_re(keywords)
+    return tuple(idx for idx, col in enumerate(columns) if col and keyword_re.search(col))
+
 
 def mask_sensitive_value(value: Any, keep_start: int, keep_end: int) -> Any:
     if value is None:
@@ -11,7 +28,32 @@ def mask_sensitive_value(value: Any, keep_start: int, keep_end: int) -> Any:
     s = str(value)
     if len(s) <= keep_start + keep_end:
         return "*" * len(s)
-    return f"{s[:keep_start]}{'*' * (len(s) - keep_start - keep_end)}{s[-keep_end:]}"
+    # s[len(s) - keep_end:] rather than s[-keep_end:], which is the whole string for 0.
+    return f"{s[:keep_start]}{'*' * (len(s) - keep_start - keep_end)}{s[len(s) - keep_end:]}"
+
+
+def _value_masker(keep_start: int, keep_end: int) -> Callable[[Any], Any]:
+    """mask_sensitive_value with the keep widths bound once per call, not passed per cell."""
+    keep = keep_start + keep_end
+    if keep == 0:
+        # Nothing kept: only the length matters, so no slicing at all.
+        def mask_all(value: Any) -> Any:
+            if value is None:
+                return value
+            return "*" * len(value if type(value) is str else str(value))
+
+        return mask_all
+
+    def mask(value: Any) -> Any:
+        if value is None:
+            return value
+        s = value if type(value) is str else str(value)
+        n = len(s)
+        if n <= keep:
+            return "*" * n
+        return s[:keep_start] + "*" * (n - keep) + s[n - keep_end:]
+
+    return mask
 
 
 def mask_sensitive_rows(
@@ -22,23 +64,36 @@ def mask_sensitive_rows(
     keep_start: int = 2,
     keep_end: int = 2,
 ) -> Tuple[List[str], List[List[Any]]]:
+    """Mask values in columns whose names contain a sensitive keyword.
+
+    List rows are modified in place (and returned); other row types are copied first.
+    """
     if not columns or not rows:
         return columns, rows
     keywords = keywords or settings.sensitive_field_keywords
     if not keywords:
         return columns, rows
-    indices: List[int] = []
-    for idx, col in enumerate(columns):
-        name = (col or "").lower()
-        if any(k in name for k in keywords):
-            indices.append(idx)
+    indices = _sensitive_indices(tuple(columns), tuple(keywords))
     if not indices:
         return columns, rows
-    masked = []
-    for r in rows:
-        row = list(r)
-        for idx in indices:
-            if idx < len(row):
-                row[idx] = mask_sensitive_value(row[idx], keep_start, keep_end)
-        masked.append(row)
+    mask = _value_masker(keep_start, keep_end)
+    # run_sql returns list rows, which are masked in place; only tuple rows get copied.
+    masked = rows if all(type(r) is list for r in rows) else [list(r) for r in rows]
+    # Column at a time: each sensitive column is masked in one pass, and repeated str
+    # values (common in result sets) are masked once via a per-column memo. Only str:
+    # equal values of other types can print differently (1 / 1.0 / True, Decimal
+    # scales), and the mask depends on the printed form.
+    shortest = min(map(len, masked))
+    for idx in indices:
+        targets = masked if idx < shortest else [row for row in masked if idx < len(row)]
+        memo: dict[str, Any] = {}
+        for row in targets:
+            value = row[idx]
+            if type(value) is not str:
+                row[idx] = mask(value)
+                continue
+            out = memo.get(value, _MISSING)
+            if out is _MISSING:
+                out = memo[value] = mask(value)
+            row[idx] = out
     return columns, masked
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import cached_property
 from typing import Any
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -25,6 +26,7 @@ class Settings(BaseSettings):
     MYSQL_POOL_SIZE: int = 5
     MYSQL_MAX_OVERFLOW: int = 10
     MYSQL_POOL_RECYCLE_SECONDS: int = 3600
+    MYSQL_SCHEMA_TTL_SECONDS: int = 60
 
     # LLM (DeepSeek)
     DEEPSEEK_BASE_URL: str = ""
@@ -36,6 +38,8 @@ class Settings(BaseSettings):
     LLM_RETRY_BASE_SECONDS: float = 0.5
     LLM_CB_FAILURES: int = 3
     LLM_CB_RECOVERY_SECONDS: int = 30
+    LLM_CACHE_TTL_SECONDS: int = 600
+    LLM_CACHE_MAX_ENTRIES: int = 512
 
     # Embeddings (Qwen3)
     EMBED_BASE_URL: str = ""
@@ -46,6 +50,7 @@ class Settings(BaseSettings):
     EMBED_RETRY_BASE_SECONDS: float = 0.5
     EMBED_CB_FAILURES: int = 3
     EMBED_CB_RECOVERY_SECONDS: int = 30
+    EMBED_CACHE_MAX_ENTRIES: int = 10_000
 
     # Vector store
     CHROMA_PERSIST_DIR: str = "./data/chroma"
@@ -55,6 +60,7 @@ class Settings(BaseSettings):
     MAX_ROWS: int = 500
     MAX_SQL_RETRY: int = 2
     SLOW_QUERY_THRESHOLD_MS: int = 2000
+    SSE_ROW_CHUNK: int = 500
 
     # governance
     SENSITIVE_FIELD_KEYWORDS: str = "password,passwd,pwd,secret,token,phone,mobile,email,mail,idcard,id_card,ssn,credit,card,bank,account"
@@ -75,6 +81,15 @@ class Settings(BaseSettings):
     FILE_UPLOAD_MAX_ROWS: int = 200_000
     FILE_UPLOAD_MAX_COLS: int = 200
     FILE_UPLOAD_TTL_HOURS: int = 72
+    FILE_UPLOAD_CLEANUP_INTERVAL_SECONDS: int = 300
+    FILE_UPLOAD_INSERT_CHUNK_ROWS: int = 10_000
+    # Parser engines ("" = pandas' defaults). "pyarrow" / "calamine" are faster but need
+    # those packages and infer dtypes (nulls, timestamps) differently, so they are opt-in.
+    FILE_UPLOAD_CSV_ENGINE: str = ""
+    FILE_UPLOAD_EXCEL_ENGINE: str = ""
+
+    # Local SQLite store
+    SQLITE_POOL_SIZE: int = 8
 
     @staticmethod
     def _strip_inline_comment(value: Any) -> Any:
@@ -89,17 +104,22 @@ class Settings(BaseSettings):
         "MYSQL_POOL_SIZE",
         "MYSQL_MAX_OVERFLOW",
         "MYSQL_POOL_RECYCLE_SECONDS",
+        "MYSQL_SCHEMA_TTL_SECONDS",
         "LLM_TIMEOUT_SECONDS",
         "LLM_MAX_RETRIES",
         "LLM_CB_FAILURES",
         "LLM_CB_RECOVERY_SECONDS",
+        "LLM_CACHE_TTL_SECONDS",
+        "LLM_CACHE_MAX_ENTRIES",
         "EMBED_TIMEOUT_SECONDS",
         "EMBED_MAX_RETRIES",
         "EMBED_CB_FAILURES",
         "EMBED_CB_RECOVERY_SECONDS",
+        "EMBED_CACHE_MAX_ENTRIES",
         "MAX_ROWS",
         "MAX_SQL_RETRY",
         "SLOW_QUERY_THRESHOLD_MS",
+        "SSE_ROW_CHUNK",
         "SENSITIVE_MASK_KEEP_START",
         "SENSITIVE_MASK_KEEP_END",
         "SCHEMA_CHECK_INTERVAL_HOURS",
@@ -112,6 +132,9 @@ class Settings(BaseSettings):
         "FILE_UPLOAD_MAX_ROWS",
         "FILE_UPLOAD_MAX_COLS",
         "FILE_UPLOAD_TTL_HOURS",
+        "FILE_UPLOAD_CLEANUP_INTERVAL_SECONDS",
+        "FILE_UPLOAD_INSERT_CHUNK_ROWS",
+        "SQLITE_POOL_SIZE",
         mode="before",
     )
     @classmethod
@@ -123,12 +146,14 @@ class Settings(BaseSettings):
     def _strip_float_comments(cls, v: Any) -> Any:
         return cls._strip_inline_comment(v)
 
-    @property
+    # Derived values are computed on first use and then reused: settings are loaded
+    # once at import and treated as read-only afterwards.
+    @cached_property
     def sensitive_field_keywords(self) -> list[str]:
         raw = self.SENSITIVE_FIELD_KEYWORDS or ""
         return [s.strip().lower() for s in raw.split(",") if s.strip()]
 
-    @property
+    @cached_property
     def mysql_dsn(self) -> str:
         # SQLAlchemy async DSN for aiomysql
         return (
@@ -136,15 +161,15 @@ class Settings(BaseSettings):
             f"@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
         )
 
-    @property
+    @cached_property
     def has_mysql_config(self) -> bool:
         return all([self.MYSQL_HOST, self.MYSQL_DATABASE, self.MYSQL_USER, self.MYSQL_PASSWORD])
 
-    @property
+    @cached_property
     def has_llm_config(self) -> bool:
         return all([self.DEEPSEEK_BASE_URL, self.DEEPSEEK_API_KEY, self.DEEPSEEK_MODEL])
 
-    @property
+    @cached_property
     def has_embed_config(self) -> bool:
         return all([self.EMBED_BASE_URL, self.EMBED_API_KEY, self.EMBED_MODEL])
 
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-import json
+import time
 from typing import Any, Dict, Tuple
 
+import orjson
+
 from backend.app.core.config import settings
 from backend.app.core.sqlite_store import (
     add_datasource,
@@ -10,6 +12,31 @@ from backend.app.core.sqlite_store import (
     get_default_datasource,
 )
 
+# resolve_datasource results by requested id: (expires_at_monotonic, (ds_id, config)).
+_RESOLVE_TTL_S = 30.0
+_resolve_cache: dict[str, tuple[float, tuple[str, dict[str, Any]]]] = {}
+
+
+# Parsed config_json by datasource id: (raw config_json, parsed). Configs are written
+# once, so the stored text doubles as the version and a changed row is simply re-parsed.
+_config_cache: dict[str, tuple[str, dict[str, Any]]] = {}
+
+
+def datasource_config(ds: dict[str, Any]) -> dict[str, Any]:
+    """Parsed config of a data_sources row, reusing the previous parse while it is unchanged."""
+    raw = ds["config_json"]
+    cached = _config_cache.get(ds["id"])
+    if cached is not None and cached[0] == raw:
+        return cached[1]
+    config = orjson.loads(raw)
+    _config_cache[ds["id"]] = (raw, config)
+    return config
+
+
+def invalidate_resolved_datasources() -> None:
+    """Forget cached resolve_datasource results (a datasource was added or the default changed)."""
+    _resolve_cache.clear()
+
 
 def _default_mysql_config() -> Dict[str, Any]:
     return {
@@ -31,16 +58,27 @@ async def ensure_default_datasource() -> None:
         ds_id="default",
         name="Default MySQL",
         ds_type="mysql",
-        config_json=json.dumps(_default_mysql_config()),
+        config_json=orjson.dumps(_default_mysql_config()).decode(),
         is_default=True,
     )
+    invalidate_resolved_datasources()
 
 
 async def resolve_datasource(ds_id: str | None) -> Tuple[str, Dict[str, Any]]:
+    """(id, config) for the requested datasource, falling back to the default one.
+
+    Cached briefly: schema browsing resolves the same header on every request.
+    """
     ds_id = ds_id or "default"
+    now = time.monotonic()
+    cached = _resolve_cache.get(ds_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
     ds = await get_datasource(ds_id)
     if ds is None:
         ds = await get_default_datasource()
     if ds is None:
         raise RuntimeError("No datasource configured")
-    return ds["id"], json.loads(ds["config_json"])
+    resolved = ds["id"], datasource_config(ds)
+    _resolve_cache[ds_id] = (now + _RESOLVE_TTL_S, resolved)
+    return resolved
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import hashlib
+import importlib.util
 import logging
-from typing import Any, AsyncGenerator, Dict, List, Optional
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, List
 
 import httpx
+import orjson
 
 from backend.app.core.config import settings
 from backend.app.core.resilience import CircuitBreaker, CircuitOpenError, async_retry
@@ -24,31 +30,158 @@ _embed_breaker = CircuitBreaker(
 )
 
 
+class _ResponseCache:
+    """In-memory TTL + LRU cache of chat completions, keyed by the exact request."""
+
+    def __init__(self, ttl_s: int, max_entries: int):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._items: OrderedDict[bytes, tuple[float, str]] = OrderedDict()
+
+    @staticmethod
+    def key(model: str, temperature: float, messages: list[dict[str, str]]) -> bytes:
+        raw = orjson.dumps([model, temperature, messages], option=orjson.OPT_SORT_KEYS)
+        return hashlib.blake2b(raw, digest_size=16).digest()
+
+    def get(self, key: bytes) -> str | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def put(self, key: bytes, value: str) -> None:
+        if self.ttl_s <= 0 or self.max_entries <= 0:
+            return
+        self._items[key] = (time.monotonic() + self.ttl_s, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+
+_chat_cache = _ResponseCache(settings.LLM_CACHE_TTL_SECONDS, settings.LLM_CACHE_MAX_ENTRIES)
+
+
+class _EmbeddingCache:
+    """In-memory LRU of embedding vectors, keyed by (model, text) content hash.
+
+    Vectors never go stale for a given model and text, so entries only leave on eviction.
+    Locked: the sync embedding bridge calls embed() from several worker threads at once.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: OrderedDict[bytes, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, text: str) -> bytes:
+        return hashlib.blake2b(f"{model}\0{text}".encode(), digest_size=16).digest()
+
+    def get(self, key: bytes) -> list[float] | None:
+        with self._lock:
+            vec = self._items.get(key)
+            if vec is not None:
+                self._items.move_to_end(key)
+            return vec
+
+    def put(self, key: bytes, vec: list[float]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._items[key] = vec
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+_embed_cache = _EmbeddingCache(settings.EMBED_CACHE_MAX_ENTRIES)
+
+
+# One pooled AsyncClient per event loop, so LLM/embedding calls reuse keep-alive
+# connections instead of paying TCP + TLS setup each time. Clients are bound to the
+# loop that opened their connections; the sync embedding bridge runs its own loops.
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+# HTTP/2 (when the optional h2 package is installed) multiplexes concurrent chat and
+# embedding calls over one connection; servers without h2 ALPN fall back to HTTP/1.1.
+_HTTP2 = importlib.util.find_spec("h2") is not None
+_http_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _http_clients[loop] = httpx.AsyncClient(limits=_HTTP_LIMITS, http2=_HTTP2)
+    return client
+
+
+async def close_http_client() -> None:
+    """Close the current event loop's pooled client (app shutdown, end of a bridge loop)."""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+_RETRY_STATUSES = frozenset({408, 429, *range(500, 600)})
+
+
 def _is_retryable_http(err: BaseException) -> bool:
     if isinstance(err, (httpx.TimeoutException, httpx.NetworkError)):
         return True
     if isinstance(err, httpx.HTTPStatusError):
-        code = err.response.status_code
-        return code in (408, 429) or 500 <= code < 600
+        return err.response.status_code in _RETRY_STATUSES
     return False
 
 
+async def _sse_data(resp: httpx.Response) -> AsyncGenerator[bytes, None]:
+    """Yield the payload of each non-empty ``data:`` line of a server-sent event stream.
+
+    Works on raw bytes (no per-chunk str decode and line splitting); comment, event and
+    blank lines are dropped.
+    """
+    buf = bytearray()
+    async for raw in resp.aiter_bytes():
+        buf += raw
+        start = 0
+        while (nl := buf.find(b"\n", start)) != -1:
+            if buf.startswith(b"data:", start, nl):
+                data = bytes(buf[start + 5 : nl]).strip()
+                if data:
+                    yield data
+            start = nl + 1
+        del buf[:start]
+    if buf.startswith(b"data:"):
+        data = bytes(buf[5:]).strip()
+        if data:
+            yield data
+
+
 class OpenAICompatChatClient:
     def __init__(self, base_url: str, api_key: str, model: str, timeout_s: int):
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
         self.model = model
         self.timeout_s = timeout_s
+        # Built once; bodies are posted as pre-encoded orjson bytes, hence the Content-Type.
+        self._headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
 
     async def _post_json(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         _chat_breaker.check()
-        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        body = orjson.dumps(payload)  # once, not per retry
 
         async def _do():
-            async with httpx.AsyncClient(timeout=self.timeout_s) as client:
-                resp = await client.post(url, headers=headers, json=payload)
-                resp.raise_for_status()
-                return resp.json()
+            resp = await _http_client().post(
+                url, headers=self._headers, content=body, timeout=self.timeout_s
+            )
+            resp.raise_for_status()
+            return orjson.loads(resp.content)
 
         try:
             data = await async_retry(
@@ -63,7 +196,17 @@ class OpenAICompatChatClient:
             _chat_breaker.record_failure()
             raise
 
-    async def chat(self, messages: List[Dict[str, str]], *, temperature: float = 0.2) -> str:
+    async def chat(
+        self, messages: list[dict[str, str]], *, temperature: float = 0.2, cache: bool = False
+    ) -> str:
+        # cache=True serves repeated identical requests (same model, temperature and
+        # messages, which already carry schema context, table scope and history).
+        cache_key = _ResponseCache.key(self.model, temperature, messages) if cache else None
+        if cache_key is not None:
+            cached = _chat_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         url = f"{self.base_url}/chat/completions"
         payload: Dict[str, Any] = {
             "model": self.model,
@@ -75,60 +218,57 @@ class OpenAICompatChatClient:
         # Some OpenAI-compatible providers return additional nested usage fields.
         # Vanna 2.0 users often need to sanitize those (see related issue). citeturn6view0
         try:
-            return data["choices"][0]["message"]["content"]
+            content = data["choices"][0]["message"]["content"]
         except Exception as e:
             log.error("Unexpected chat response: %s", data)
             raise RuntimeError(f"Unexpected chat response: {e}") from e
+        if cache_key is not None and content:
+            _chat_cache.put(cache_key, content)
+        return content
 
     async def chat_stream(
         self, messages: List[Dict[str, str]], *, temperature: float = 0.2
     ) -> AsyncGenerator[str, None]:
         url = f"{self.base_url}/chat/completions"
-        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
         payload: Dict[str, Any] = {
             "model": self.model,
             "messages": messages,
             "temperature": temperature,
             "stream": True,
         }
+        body = orjson.dumps(payload)
 
         attempt = 0
         while True:
             yielded = False
             try:
                 _chat_breaker.check()
-                async with httpx.AsyncClient(timeout=self.timeout_s) as client:
-                    async with client.stream("POST", url, headers=headers, json=payload) as resp:
-                        resp.raise_for_status()
-                        async for line in resp.aiter_lines():
-                            if not line or line.startswith(":"):
-                                continue
-                            if not line.startswith("data:"):
-                                continue
-                            data_str = line[5:].strip()
-                            if not data_str:
-                                continue
-                            if data_str == "[DONE]":
-                                _chat_breaker.record_success()
-                                return
-
-                            try:
-                                data = json.loads(data_str)
-                            except Exception:
-                                continue
-
-                            choices = data.get("choices") or []
-                            if not choices:
-                                continue
-                            choice = choices[0] or {}
-                            delta = choice.get("delta") or {}
-                            chunk = delta.get("content")
-                            if chunk is None:
-                                msg = choice.get("message") or {}
-                                chunk = msg.get("content")
-                            if chunk:
-                                yielded = True
-                                yield chunk
+                async with _http_client().stream(
+                    "POST", url, headers=self._headers, content=body, timeout=self.timeout_s
+                ) as resp:
+                    resp.raise_for_status()
+                    async for data_str in _sse_data(resp):
+                        if data_str == b"[DONE]":
+                            _chat_breaker.record_success()
+                            return
+
+                        try:
+                            data = orjson.loads(data_str)
+                        except orjson.JSONDecodeError:
+                            continue
+
+                        choices = data.get("choices") or []
+                        if not choices:
+                            continue
+                        choice = choices[0] or {}
+                        delta = choice.get("delta") or {}
+                        chunk = delta.get("content")
+                        if chunk is None:
+                            msg = choice.get("message") or {}
+                            chunk = msg.get("content")
+                        if chunk:
+                            yielded = True
+                            yield chunk
                 _chat_breaker.record_success()
                 return
             except CircuitOpenError:
@@ -151,18 +291,20 @@ class OpenAICompatEmbeddingClient:
         self.api_key = api_key
         self.model = model
         self.timeout_s = timeout_s
+        self._headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
 
-    async def embed(self, texts: List[str]) -> List[List[float]]:
+    async def _embed_batch(self, texts: list[str]) -> list[list[float]]:
         url = f"{self.base_url}/embeddings"
         payload: Dict[str, Any] = {"model": self.model, "input": texts}
         _embed_breaker.check()
+        body = orjson.dumps(payload)
 
         async def _do():
-            headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
-            async with httpx.AsyncClient(timeout=self.timeout_s) as client:
-                resp = await client.post(url, headers=headers, json=payload)
-                resp.raise_for_status()
-                return resp.json()
+            resp = await _http_client().post(
+                url, headers=self._headers, content=body, timeout=self.timeout_s
+            )
+            resp.raise_for_status()
+            return orjson.loads(resp.content)
 
         try:
             data = await async_retry(
@@ -176,26 +318,78 @@ class OpenAICompatEmbeddingClient:
             _embed_breaker.record_failure()
             raise
         # OpenAI shape: {"data":[{"embedding":[...], "index":0}, ...]}
-        return [item["embedding"] for item in data["data"]]
+        items = data["data"]
+        if len(items) != len(texts):
+            raise RuntimeError(
+                f"Unexpected embedding response: {len(items)} vectors for {len(texts)} inputs"
+            )
+        items = sorted(items, key=lambda item: item.get("index", 0))
+        return [item["embedding"] for item in items]
+
+    async def embed(
+        self, texts: list[str], *, batch_size: int = 64, max_concurrency: int = 8
+    ) -> list[list[float]]:
+        """Embeddings for ``texts``, in order.
+
+        Previously seen texts are served from the in-memory cache; the rest are sent in
+        requests of ``batch_size`` texts, at most ``max_concurrency`` in flight, instead
+        of one oversized request.
+        """
+        keys = [_EmbeddingCache.key(self.model, t) for t in texts]
+        out: list[Any] = [_embed_cache.get(k) for k in keys]
+        missing = [i for i, vec in enumerate(out) if vec is None]
+        if not missing:
+            return out
+        if len(missing) <= batch_size:
+            chunks = [missing]
+        else:
+            # Longest first, so each batch holds texts of similar length.
+            missing.sort(key=lambda i: len(texts[i]), reverse=True)
+            chunks = [missing[i : i + batch_size] for i in range(0, len(missing), batch_size)]
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def _run(chunk: list[int]) -> list[list[float]]:
+            async with sem:
+                return await self._embed_batch([texts[i] for i in chunk])
+
+        for chunk, vectors in zip(chunks, await asyncio.gather(*map(_run, chunks)), strict=True):
+            for i, vec in zip(chunk, vectors, strict=True):
+                out[i] = vec
+                _embed_cache.put(keys[i], vec)
+        return out
+
+
+# Clients are stateless apart from their settings-derived fields (the connection pool is
+# per event loop, above), so one instance of each is shared by every caller.
+_chat_client: OpenAICompatChatClient | None = None
+_embed_client: OpenAICompatEmbeddingClient | None = None
 
 
 def get_chat_client() -> OpenAICompatChatClient:
+    global _chat_client
+    if _chat_client is not None:
+        return _chat_client
     if not settings.has_llm_config:
         raise RuntimeError("LLM config missing: set DEEPSEEK_BASE_URL/DEEPSEEK_API_KEY/DEEPSEEK_MODEL")
-    return OpenAICompatChatClient(
+    _chat_client = OpenAICompatChatClient(
         base_url=settings.DEEPSEEK_BASE_URL,
         api_key=settings.DEEPSEEK_API_KEY,
         model=settings.DEEPSEEK_MODEL,
         timeout_s=settings.LLM_TIMEOUT_SECONDS,
     )
+    return _chat_client
 
 
 def get_embed_client() -> OpenAICompatEmbeddingClient:
+    global _embed_client
+    if _embed_client is not None:
+        return _embed_client
     if not settings.has_embed_config:
         raise RuntimeError("Embedding config missing: set EMBED_BASE_URL/EMBED_API_KEY/EMBED_MODEL")
-    return OpenAICompatEmbeddingClient(
+    _embed_client = OpenAICompatEmbeddingClient(
         base_url=settings.EMBED_BASE_URL,
         api_key=settings.EMBED_API_KEY,
         model=settings.EMBED_MODEL,
         timeout_s=settings.EMBED_TIMEOUT_SECONDS,
     )
+    return _embed_client
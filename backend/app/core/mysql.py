@@ -1,14 +1,18 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
 import re
-from typing import Any, Dict, List, Tuple
+import time
+from typing import Any, Dict, List, NamedTuple, Tuple
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
 from sqlalchemy.exc import DBAPIError, OperationalError, TimeoutError as SATimeoutError
+from sqlalchemy.pool import NullPool
 
 from backend.app.core.config import settings
 from backend.app.core.resilience import CircuitBreaker, async_retry
@@ -17,6 +21,10 @@ log = logging.getLogger("mysql")
 
 _engine_cache: Dict[str, AsyncEngine] = {}
 _sync_engine_cache: Dict[str, Any] = {}
+# list_tables results per cache_key: (expires_at, tables, table names), plus in-flight
+# loads so concurrent misses share one INFORMATION_SCHEMA query.
+_tables_cache: dict[str, tuple[float, list[dict[str, Any]], frozenset[str]]] = {}
+_tables_inflight: dict[str, asyncio.Task[list[dict[str, Any]]]] = {}
 _IDENT = re.compile(r"^[A-Za-z0-9_]+$")
 _mysql_breaker = CircuitBreaker(
     "mysql",
@@ -59,6 +67,7 @@ def _get_engine(config: Dict[str, Any] | None, cache_key: str) -> AsyncEngine:
             pool_recycle=settings.MYSQL_POOL_RECYCLE_SECONDS,
             connect_args={"connect_timeout": settings.MYSQL_CONNECT_TIMEOUT_SECONDS},
         )
+        _install_query_timeout(_engine_cache[key].sync_engine)
     return _engine_cache[key]
 
 
@@ -87,7 +96,15 @@ async def close_engine() -> None:
     _sync_engine_cache.clear()
 
 
-_BAD_SQL = re.compile(r"\b(INSERT|UPDATE|DELETE|DROP|TRUNCATE|ALTER|CREATE|REPLACE|GRANT|REVOKE)\b", re.I)
+# One alternation, so the check is a single regex scan. The multi-word forms cover MySQL
+# statements that write without using one of the plain keywords, while still letting
+# columns named e.g. `load` or `lock` through.
+_BAD_SQL = re.compile(
+    r"\b(?:INSERT|UPDATE|DELETE|DROP|TRUNCATE|ALTER|CREATE|REPLACE|GRANT|REVOKE"
+    r"|RENAME\s+(?:TABLE|USER)|LOAD\s+(?:DATA|XML)|(?:UN)?LOCK\s+TABLES?|INTO\s+(?:OUT|DUMP)FILE)\b"
+    r"|\bCALL\s+[\w.`]+\s*\(",
+    re.I,
+)
 _GOOD_PREFIX = re.compile(r"^\s*(SELECT|WITH)\b", re.I)
 
 def _is_retryable_mysql(err: BaseException) -> bool:
@@ -99,23 +116,72 @@ def _is_retryable_mysql(err: BaseException) -> bool:
         return isinstance(err, OperationalError)
     return False
 
-async def _apply_query_timeout(conn) -> None:
+def _install_query_timeout(engine) -> None:
+    """Set MAX_EXECUTION_TIME once per new pooled connection.
+
+    The session variable survives checkouts, so queries no longer pay an extra SET
+    round-trip each. Pool events live on the sync side, hence AsyncEngine.sync_engine.
+    """
     if settings.MYSQL_QUERY_TIMEOUT_SECONDS <= 0:
         return
-    try:
-        ms = int(settings.MYSQL_QUERY_TIMEOUT_SECONDS * 1000)
-        await conn.execute(text("SET SESSION MAX_EXECUTION_TIME=:ms"), {"ms": ms})
-    except Exception:
-        # Best effort: not all MySQL flavors support this.
-        pass
+    stmt = f"SET SESSION MAX_EXECUTION_TIME={int(settings.MYSQL_QUERY_TIMEOUT_SECONDS * 1000)}"
+
+    @event.listens_for(engine, "connect")
+    def _set_timeout(dbapi_conn, _record) -> None:
+        cursor = dbapi_conn.cursor()
+        try:
+            cursor.execute(stmt)
+        except Exception:
+            # Best effort: not all MySQL flavors support this.
+            pass
+        finally:
+            cursor.close()
 
 async def _with_timeout(coro):
     if settings.MYSQL_QUERY_TIMEOUT_SECONDS <= 0:
         return await coro
     return await asyncio.wait_for(coro, timeout=settings.MYSQL_QUERY_TIMEOUT_SECONDS)
 
+# Fixed statements are built once; other statement strings go through a small cache,
+# since preview/count/drop SQL repeats per table and re-run queries repeat verbatim.
+_PING_SQL = text("SELECT 1")
+_LIST_TABLES_SQL = text(
+    """
+    SELECT TABLE_NAME, TABLE_TYPE, TABLE_COMMENT
+    FROM INFORMATION_SCHEMA.TABLES
+    WHERE TABLE_SCHEMA = :db
+    ORDER BY TABLE_NAME
+    """
+)
+_SCHEMA_COLUMNS_SQL = text(
+    """
+    SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_COMMENT
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_SCHEMA = :db
+    ORDER BY TABLE_NAME, ORDINAL_POSITION
+    """
+)
+_TABLE_COLUMNS_SQL = text(
+    """
+    SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_COMMENT
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_SCHEMA = :db AND TABLE_NAME = :table
+    ORDER BY ORDINAL_POSITION
+    """
+)
+
+
+@functools.lru_cache(maxsize=256)
+def _text_clause(sql: str) -> TextClause:
+    return text(sql)
+
+
+def _as_clause(sql: str | TextClause) -> TextClause:
+    return _text_clause(sql) if isinstance(sql, str) else sql
+
+
 async def _execute_fetchmany(
-    sql: str,
+    sql: str | TextClause,
     params: Dict[str, Any] | None,
     max_rows: int,
     config: Dict[str, Any] | None,
@@ -123,36 +189,35 @@ async def _execute_fetchmany(
 ) -> Tuple[List[str], List[Any]]:
     engine = _get_engine(config, cache_key)
     async with engine.connect() as conn:
-        await _apply_query_timeout(conn)
-        res = await conn.execute(text(sql), params or {})
-        rows = res.fetchmany(size=max_rows)
-        cols = list(res.keys())
+        # Server-side cursor: only the first max_rows rows are turned into Python
+        # objects; a plain execute() would buffer and convert the whole result first.
+        async with conn.stream(_as_clause(sql), params or {}) as res:
+            cols = list(res.keys())
+            rows = await res.fetchmany(max_rows)
     return cols, rows
 
 async def _execute_fetchall(
-    sql: str,
+    sql: str | TextClause,
     params: Dict[str, Any] | None,
     config: Dict[str, Any] | None,
     cache_key: str,
 ) -> Tuple[List[str], List[Any]]:
     engine = _get_engine(config, cache_key)
     async with engine.connect() as conn:
-        await _apply_query_timeout(conn)
-        res = await conn.execute(text(sql), params or {})
+        res = await conn.execute(_as_clause(sql), params or {})
         rows = res.fetchall()
         cols = list(res.keys())
     return cols, rows
 
 async def _execute_noresult(
-    sql: str,
+    sql: str | TextClause,
     params: Dict[str, Any] | None,
     config: Dict[str, Any] | None,
     cache_key: str,
 ) -> None:
     engine = _get_engine(config, cache_key)
     async with engine.connect() as conn:
-        await _apply_query_timeout(conn)
-        await conn.execute(text(sql), params or {})
+        await conn.execute(_as_clause(sql), params or {})
 
 async def _with_mysql_retry(op):
     _mysql_breaker.check()
@@ -170,10 +235,9 @@ async def _with_mysql_retry(op):
         raise
 
 def validate_readonly_sql(sql: str) -> None:
-    if not _GOOD_PREFIX.search(sql):
-        raise ValueError("Only SELECT/WITH queries are allowed.")
-    if _BAD_SQL.search(sql):
-        raise ValueError("Write/DDL statements are not allowed.")
+    error = analyze_sql(sql).error
+    if error:
+        raise ValueError(error)
 
 
 async def run_sql(
@@ -187,7 +251,7 @@ async def run_sql(
         return await _with_timeout(_execute_fetchmany(sql, None, max_rows, config, cache_key))
 
     cols, rows = await _with_mysql_retry(_op)
-    return cols, [list(r) for r in rows]
+    return cols, list(map(list, rows))
 
 
 async def fetch_schema_documents(
@@ -195,15 +259,11 @@ async def fetch_schema_documents(
     cache_key: str = "default",
 ) -> List[Dict[str, Any]]:
     """Fetch schema info from information_schema and return docs for vector store."""
-    sql = """
-    SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_COMMENT
-    FROM INFORMATION_SCHEMA.COLUMNS
-    WHERE TABLE_SCHEMA = :db
-    ORDER BY TABLE_NAME, ORDINAL_POSITION
-    """
     cfg = _normalize_config(config)
     async def _op():
-        return await _with_timeout(_execute_fetchall(sql, {"db": cfg["database"]}, config, cache_key))
+        return await _with_timeout(
+            _execute_fetchall(_SCHEMA_COLUMNS_SQL, {"db": cfg["database"]}, config, cache_key)
+        )
     _, rows = await _with_mysql_retry(_op)
 
     by_table: Dict[str, List[Dict[str, Any]]] = {}
@@ -251,16 +311,12 @@ async def fetch_schema_documents_for_table(
 ) -> List[Dict[str, Any]]:
     if not _IDENT.fullmatch(table_name or ""):
         raise ValueError("Invalid table name")
-    sql = """
-    SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_COMMENT
-    FROM INFORMATION_SCHEMA.COLUMNS
-    WHERE TABLE_SCHEMA = :db AND TABLE_NAME = :table
-    ORDER BY ORDINAL_POSITION
-    """
     cfg = _normalize_config(config)
     async def _op():
         return await _with_timeout(
-            _execute_fetchall(sql, {"db": cfg["database"], "table": table_name}, config, cache_key)
+            _execute_fetchall(
+                _TABLE_COLUMNS_SQL, {"db": cfg["database"], "table": table_name}, config, cache_key
+            )
         )
     _, rows = await _with_mysql_retry(_op)
 
@@ -291,19 +347,64 @@ def _quote_ident(name: str) -> str:
     return f"`{name}`"
 
 
+def invalidate_tables_cache(cache_key: str | None = None) -> None:
+    """Drop cached list_tables results for one datasource (or all of them)."""
+    if cache_key is None:
+        _tables_cache.clear()
+        _tables_inflight.clear()
+    else:
+        _tables_cache.pop(cache_key, None)
+        _tables_inflight.pop(cache_key, None)
+
+
 async def list_tables(
     config: Dict[str, Any] | None = None,
     cache_key: str = "default",
+) -> list[dict[str, Any]]:
+    cached = _tables_cache.get(cache_key)
+    if cached is not None and cached[0] > time.monotonic():
+        return list(cached[1])
+    task = _tables_inflight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_load_tables(config, cache_key))
+        _tables_inflight[cache_key] = task
+        task.add_done_callback(lambda t, key=cache_key: _tables_loaded(key, t))
+    # shield: a cancelled caller must not cancel the load other callers are waiting on.
+    return list(await asyncio.shield(task))
+
+
+def _tables_loaded(cache_key: str, task: asyncio.Task[list[dict[str, Any]]]) -> None:
+    if _tables_inflight.get(cache_key) is not task:
+        return  # invalidated while loading; don't cache a possibly stale result
+    del _tables_inflight[cache_key]
+    if task.cancelled() or task.exception() is not None:
+        return
+    if settings.MYSQL_SCHEMA_TTL_SECONDS > 0:
+        tables = task.result()
+        _tables_cache[cache_key] = (
+            time.monotonic() + settings.MYSQL_SCHEMA_TTL_SECONDS,
+            tables,
+            frozenset(t["name"] for t in tables),
+        )
+
+
+async def _table_names(config: dict[str, Any] | None, cache_key: str) -> frozenset[str]:
+    """Names from list_tables; served from the cached set without copying the table list."""
+    cached = _tables_cache.get(cache_key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[2]
+    return frozenset(t["name"] for t in await list_tables(config, cache_key))
+
+
+async def _load_tables(
+    config: dict[str, Any] | None,
+    cache_key: str,
 ) -> List[Dict[str, Any]]:
-    sql = """
-    SELECT TABLE_NAME, TABLE_TYPE, TABLE_COMMENT
-    FROM INFORMATION_SCHEMA.TABLES
-    WHERE TABLE_SCHEMA = :db
-    ORDER BY TABLE_NAME
-    """
     cfg = _normalize_config(config)
     async def _op():
-        return await _with_timeout(_execute_fetchall(sql, {"db": cfg["database"]}, config, cache_key))
+        return await _with_timeout(
+            _execute_fetchall(_LIST_TABLES_SQL, {"db": cfg["database"]}, config, cache_key)
+        )
     _, rows = await _with_mysql_retry(_op)
     out: List[Dict[str, Any]] = []
     for r in rows:
@@ -329,16 +430,14 @@ async def preview_table(
     if limit > 100:
         limit = 100
 
-    tables = await list_tables(config, cache_key)
-    allowed = {t["name"] for t in tables}
-    if table_name not in allowed:
+    if table_name not in await _table_names(config, cache_key):
         raise ValueError("Table not found")
 
     sql = f"SELECT * FROM {_quote_ident(table_name)} LIMIT :limit"
     async def _op():
         return await _with_timeout(_execute_fetchmany(sql, {"limit": limit}, limit, config, cache_key))
     cols, rows = await _with_mysql_retry(_op)
-    return cols, [list(r) for r in rows]
+    return cols, list(map(list, rows))
 
 
 async def preview_table_page(
@@ -356,9 +455,7 @@ async def preview_table_page(
     if page_size > 200:
         page_size = 200
 
-    tables = await list_tables(config, cache_key)
-    allowed = {t["name"] for t in tables}
-    if table_name not in allowed:
+    if table_name not in await _table_names(config, cache_key):
         raise ValueError("Table not found")
 
     count_sql = f"SELECT COUNT(*) AS cnt FROM {_quote_ident(table_name)}"
@@ -384,7 +481,13 @@ def import_dataframe(
     if not _IDENT.fullmatch(table_name or ""):
         raise ValueError("Invalid table name")
     engine = _get_sync_engine(config, cache_key)
-    df.to_sql(table_name, con=engine, if_exists="replace", index=False)
+    # Bounded batches keep the driver's parameter buffer to one chunk of rows; pandas
+    # still runs all chunks in a single transaction.
+    chunksize = settings.FILE_UPLOAD_INSERT_CHUNK_ROWS
+    if chunksize <= 0:
+        chunksize = None
+    df.to_sql(table_name, con=engine, if_exists="replace", index=False, chunksize=chunksize)
+    invalidate_tables_cache(cache_key)
 
 
 async def drop_table(
@@ -396,29 +499,75 @@ async def drop_table(
     async def _op():
         return await _with_timeout(_execute_noresult(sql, None, config, cache_key))
     await _with_mysql_retry(_op)
+    invalidate_tables_cache(cache_key)
+
+
+# Possessive quantifiers (3.11+) never give back what they matched, so a failed
+# attempt at one FROM/JOIN position is abandoned in linear time instead of backtracking.
+# Groups: (first identifier, identifier after a "."), quotes excluded, so `db`.`t` and
+# t both yield the table name without any per-match stripping or splitting.
+_TABLE_REF_RE = re.compile(
+    r"\b(?:from|join)\s++[`\"\[]?+(\w++)[`\"\]]?+(?:\.[`\"\[]?+(\w++)[`\"\]]?+)?+", re.I
+)
+
+class SqlInfo(NamedTuple):
+    tables: frozenset[str]
+    # Why the statement is not an allowed read-only query; None when it is.
+    error: str | None
+
+    @property
+    def readonly(self) -> bool:
+        return self.error is None
+
+
+@functools.lru_cache(maxsize=2048)
+def analyze_sql(sql: str) -> SqlInfo:
+    """Referenced tables and the read-only check for one statement, computed together.
+
+    Cached: the allowlist check, run_sql's validation and re-runs of the same query
+    (or the same SQL across a QA bulk import) all look at identical text.
+    """
+    sql = sql or ""
+    names = frozenset((table or first).lower() for first, table in _TABLE_REF_RE.findall(sql))
+    if not _GOOD_PREFIX.search(sql):
+        error = "Only SELECT/WITH queries are allowed."
+    elif _BAD_SQL.search(sql):
+        error = "Write/DDL statements are not allowed."
+    else:
+        error = None
+    return SqlInfo(names, error)
+
 
+def extract_table_names(sql: str) -> frozenset[str]:
+    """Table names referenced by FROM/JOIN, lowercased for allowlist comparison."""
+    return analyze_sql(sql).tables
 
-_TABLE_REF_RE = re.compile(r"\b(from|join)\s+([`\"\\[]?[\w]+[`\"\\]]?(?:\.[`\"\\[]?[\w]+[`\"\\]]?)?)", re.I)
 
-def extract_table_names(sql: str) -> List[str]:
-    names: List[str] = []
-    for m in _TABLE_REF_RE.finditer(sql or ""):
-        ident = m.group(2)
-        if not ident:
-            continue
-        if ident.startswith("("):
-            continue
-        ident = ident.strip("`\"[]")
-        if "." in ident:
-            ident = ident.split(".")[-1]
-        names.append(ident)
-    return names
+async def test_connection(config: dict[str, Any]) -> bool:
+    """Run SELECT 1 on a fresh, unpooled connection.
+
+    Unlike ping(), this bypasses the cached per-datasource pool (and its warm connections),
+    so it reports whether a new connection with this config can be established right now.
+    """
+    engine = create_async_engine(
+        _dsn_from_config(config, True),
+        poolclass=NullPool,
+        connect_args={"connect_timeout": settings.MYSQL_CONNECT_TIMEOUT_SECONDS},
+    )
+    try:
+        async with engine.connect() as conn:
+            await _with_timeout(conn.execute(_PING_SQL))
+        return True
+    except Exception:
+        return False
+    finally:
+        await engine.dispose()
 
 
 async def ping(config: Dict[str, Any] | None = None, cache_key: str = "default") -> bool:
     try:
         async def _op():
-            return await _with_timeout(_execute_fetchall("SELECT 1", None, config, cache_key))
+            return await _with_timeout(_execute_fetchall(_PING_SQL, None, config, cache_key))
         await _with_mysql_retry(_op)
         return True
     except Exception:
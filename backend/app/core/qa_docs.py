@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+from collections.abc import Iterable
 from typing import Dict, Any, List
 
+import orjson
+
 
 def build_qa_doc(
     qa_id: str,
@@ -26,3 +29,30 @@ def build_qa_doc(
         "text": text,
         "metadata": {"type": "qa", "tables": tables, "tags": tags, "datasource_id": ds_id},
     }
+
+
+def loads_safe(raw: str | bytes | None) -> Any:
+    """Decode a stored JSON list column; missing or corrupt values read as []."""
+    if not raw:
+        return []
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return []
+
+
+def build_qa_docs(ds_id: str, rows: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Vector-store docs for the enabled rows returned by ``list_qa_pairs``."""
+    return [
+        build_qa_doc(
+            r["id"],
+            ds_id,
+            r.get("question") or "",
+            r.get("sql") or "",
+            r.get("note"),
+            loads_safe(r.get("tables_json")),
+            loads_safe(r.get("tags_json")),
+        )
+        for r in rows
+        if r.get("enabled")
+    ]
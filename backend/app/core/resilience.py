@@ -11,13 +11,20 @@ class CircuitOpenError(RuntimeError):
 
 
 class CircuitBreaker:
+    """Consecutive-failure breaker shared by concurrent callers.
+
+    Lock-free: every method is a few plain attribute reads/writes with no await, so it
+    cannot interleave on the event loop. Timing uses time.monotonic(), which wall-clock
+    adjustments cannot move.
+    """
+
     def __init__(self, name: str, failure_threshold: int = 3, recovery_timeout_s: int = 30):
         self.name = name
         self.failure_threshold = max(1, int(failure_threshold))
         self.recovery_timeout_s = max(1, int(recovery_timeout_s))
         self._state = "closed"
         self._failure_count = 0
-        self._last_failure_ts = 0.0
+        self._open_until = 0.0
 
     @property
     def state(self) -> str:
@@ -26,8 +33,7 @@ class CircuitBreaker:
     def check(self) -> None:
         if self._state != "open":
             return
-        now = time.time()
-        if (now - self._last_failure_ts) >= self.recovery_timeout_s:
+        if time.monotonic() >= self._open_until:
             self._state = "half_open"
             return
         raise CircuitOpenError(f"circuit {self.name} is open")
@@ -38,9 +44,9 @@ class CircuitBreaker:
 
     def record_failure(self) -> None:
         self._failure_count += 1
-        self._last_failure_ts = time.time()
         if self._failure_count >= self.failure_threshold:
             self._state = "open"
+            self._open_until = time.monotonic() + self.recovery_timeout_s
 
 
 async def async_retry(
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Any
+
+import orjson
+from fastapi import Request, Response
+from fastapi.encoders import ENCODERS_BY_TYPE
+from fastapi.responses import ORJSONResponse as _FastAPIORJSONResponse
+
+# Browsers must revalidate every time (the lists change right after edits), but an
+# unchanged list costs a 304 with no body instead of the full JSON.
+_CACHE_CONTROL = "private, no-cache"
+
+
+def _encode_extra(obj: Any) -> Any:
+    # Same conversions jsonable_encoder would apply (Decimal -> int/float, timedelta ->
+    # seconds, bytes -> str, ...), but only for the values orjson cannot encode itself.
+    encoder = ENCODERS_BY_TYPE.get(type(obj))
+    if encoder is not None:
+        return encoder(obj)
+    return str(obj)
+
+
+class ORJSONResponse(_FastAPIORJSONResponse):
+    """orjson response that also accepts MySQL driver values (Decimal, timedelta, bytes).
+
+    Returning one directly skips FastAPI's jsonable_encoder walk over every row cell.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_encode_extra,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def etag_json_response(request: Request, content: Any) -> Response:
+    """ORJSONResponse with a content ETag; 304 Not Modified when the client already has it."""
+    response = ORJSONResponse(content, headers={"Cache-Control": _CACHE_CONTROL})
+    etag = f'"{hashlib.blake2b(response.body, digest_size=8).hexdigest()}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _CACHE_CONTROL})
+    response.headers["ETag"] = etag
+    return response
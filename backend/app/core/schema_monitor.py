@@ -13,8 +13,9 @@ from backend.app.core.sqlite_store import (
     add_schema_change_log,
 )
 from backend.app.core.datasources import resolve_datasource
-from backend.app.core.mysql import list_tables, fetch_schema_documents
+from backend.app.core.mysql import invalidate_tables_cache, list_tables, fetch_schema_documents
 from backend.app.core.training import get_store
+from backend.app.core.uploads import invalidate_available_tables
 from backend.app.core.mysql import fetch_schema_documents_for_table
 
 
@@ -75,6 +76,8 @@ async def _check_one_datasource(ds_id: str) -> None:
     _, cfg = await resolve_datasource(ds_id)
     if not all([cfg.get("host"), cfg.get("database"), cfg.get("user"), cfg.get("password")]):
         return
+    # Compare against live metadata, not a cached table list.
+    invalidate_tables_cache(ds_id)
     tables = await list_tables(cfg, ds_id)
     docs = await fetch_schema_documents(cfg, ds_id)
     cols_by_table: Dict[str, List[Dict[str, Any]]] = {}
@@ -91,6 +94,7 @@ async def _check_one_datasource(ds_id: str) -> None:
         added, removed, changed = _diff_schema(prev, current)
         if added or removed or changed:
             await add_schema_change_log(ds_id, added, removed, changed)
+            invalidate_available_tables()
             # partial retrain: only upsert changed/added tables
             targets = _extract_changed_tables(added, removed, changed)
             for t in targets:
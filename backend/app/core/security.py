@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
+import hashlib
+import time
+from collections import OrderedDict
 from typing import Optional, Dict, Any
 
 from jose import jwt, JWTError
@@ -36,3 +40,38 @@ def decode_access_token(token: str) -> Dict[str, Any]:
         return payload
     except JWTError as e:
         raise ValueError(str(e)) from e
+
+
+# Verified payloads by token digest, so a client polling with the same token skips
+# re-verification for a short while. Entries are (expires_at_monotonic, payload).
+_TOKEN_CACHE_TTL_S = 30.0
+_TOKEN_CACHE_MAX = 1024
+_token_cache: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+
+
+async def decode_access_token_cached(token: str) -> dict[str, Any]:
+    """decode_access_token for request handlers: cached, and off the event loop for
+    asymmetric algorithms (RS*/ES*/PS*), whose verification is CPU-heavy."""
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.monotonic()
+    hit = _token_cache.get(key)
+    if hit is not None and hit[0] > now:
+        _token_cache.move_to_end(key)
+        return hit[1]
+
+    if settings.JWT_ALGORITHM.upper().startswith("HS"):
+        payload = decode_access_token(token)
+    else:
+        payload = await asyncio.to_thread(decode_access_token, token)
+
+    # Never serve a payload past the token's own expiry.
+    ttl = _TOKEN_CACHE_TTL_S
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = min(ttl, exp - time.time())
+    if ttl > 0:
+        _token_cache[key] = (now + ttl, payload)
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > _TOKEN_CACHE_MAX:
+            _token_cache.popitem(last=False)
+    return payload
@@ -4,24 +4,181 @@ import os
 import sqlite3
 import asyncio
 import json
+import zlib
+from contextlib import asynccontextmanager
+from collections.abc import AsyncIterator, Sequence
 from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 
+import aiosqlite
+
+from backend.app.core.config import settings
+
 DB_PATH = os.path.abspath("./data/app.sqlite3")
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
-_lock = asyncio.Lock()
-
-def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+# cache_size is per connection; negative means KiB, so roughly 64 MB of page cache each.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA temp_store=MEMORY; "
+    "PRAGMA cache_size=-64000; PRAGMA busy_timeout=5000;"
+)
+
+
+class _ConnectionPool:
+    """Small pool of long-lived aiosqlite connections.
+
+    Connections are opened lazily (pragmas applied once per connection) and reused, so
+    calls keep a warm page cache instead of paying connect/teardown every time.
+    """
+
+    def __init__(self, path: str, size: int, query_only: bool = False) -> None:
+        self._path = path
+        self._size = size
+        self._query_only = query_only
+        self._idle: list[aiosqlite.Connection] = []
+        self._slots: asyncio.Semaphore | None = None
+
+    async def _open(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self._path)
+        conn.row_factory = sqlite3.Row
+        await conn.executescript(_PRAGMAS)
+        if self._query_only:
+            await conn.execute("PRAGMA query_only=1")
+        return conn
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._size)
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else await self._open()
+            try:
+                yield conn
+            except BaseException:
+                # Never hand a connection with an open transaction back to the pool.
+                try:
+                    await conn.rollback()
+                except Exception:
+                    await conn.close()
+                else:
+                    self._idle.append(conn)
+                raise
+            self._idle.append(conn)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await conn.close()
+        self._slots = None
+
+
+# WAL lets readers run alongside the single writer. Writes share one connection, so they
+# queue on its pool slot instead of racing for SQLite's write lock ("database is locked");
+# reads get their own query_only connections.
+_pool = _ConnectionPool(DB_PATH, max(1, settings.SQLITE_POOL_SIZE), query_only=True)
+_write_pool = _ConnectionPool(DB_PATH, 1)
+
+_WRITE_BATCH_MAX = 200
+
+
+class _BatchWriter:
+    """Group commit for small metadata writes.
+
+    Callers enqueue a unit of statements and wait until it is committed. A single writer
+    task drains everything queued while the previous commit was in flight and applies it
+    in one transaction, each unit inside its own savepoint so a failing unit is rolled
+    back and reported to its caller without affecting the rest of the batch.
+    """
+
+    def __init__(self, pool: _ConnectionPool, max_batch: int) -> None:
+        self._pool = pool
+        self._max_batch = max_batch
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def write(self, *statements: tuple[str, Sequence[Any]]) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+        fut = loop.create_future()
+        self._queue.put_nowait((statements, fut))
+        await fut
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self._max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                results = await self._apply(batch)
+            except Exception as e:
+                results = [e] * len(batch)
+            if len(results) != len(batch):
+                # Never leave a caller waiting on a future that no result maps to.
+                results = [RuntimeError("batched write result count mismatch")] * len(batch)
+            for (_, fut), err in zip(batch, results, strict=True):
+                if fut.done():
+                    continue
+                if err is None:
+                    fut.set_result(None)
+                else:
+                    fut.set_exception(err)
+
+    async def _apply(
+        self, batch: list[tuple[tuple[tuple[str, Sequence[Any]], ...], asyncio.Future]]
+    ) -> list[Exception | None]:
+        results: list[Exception | None] = []
+        async with self._pool.connection() as conn:
+            await conn.execute("BEGIN")
+            for statements, _ in batch:
+                await conn.execute("SAVEPOINT batch_unit")
+                try:
+                    for sql, params in statements:
+                        await conn.execute(sql, params)
+                except Exception as e:
+                    await conn.execute("ROLLBACK TO batch_unit")
+                    results.append(e)
+                else:
+                    results.append(None)
+                await conn.execute("RELEASE batch_unit")
+            await conn.commit()
+        return results
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        queue, self._queue = self._queue, None
+        while queue is not None and not queue.empty():
+            _, fut = queue.get_nowait()
+            if not fut.done():
+                fut.set_exception(RuntimeError("SQLite store is closed"))
+
+
+_writer = _BatchWriter(_write_pool, _WRITE_BATCH_MAX)
+
+
+async def _fetchone(conn: aiosqlite.Connection, sql: str, params: Any = ()) -> sqlite3.Row | None:
+    async with conn.execute(sql, params) as cur:
+        return await cur.fetchone()
+
+
+async def close_sqlite() -> None:
+    await _writer.close()
+    await _write_pool.close()
+    await _pool.close()
 
 async def init_sqlite() -> None:
-    async with _lock:
-        conn = _connect()
-        cur = conn.cursor()
-        cur.executescript(
+    async with _write_pool.connection() as conn:
+        await conn.executescript(
             """
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -71,6 +228,7 @@ async def init_sqlite() -> None:
                 safety_text TEXT,
                 fix_text TEXT,
                 view_json TEXT,
+                rows_encoding TEXT,
                 created_at TEXT NOT NULL
             );
 
@@ -138,82 +296,92 @@ async def init_sqlite() -> None:
             );
             """
         )
-        cols = {r["name"] for r in cur.execute("PRAGMA table_info(file_uploads)").fetchall()}
+        cols = {r["name"] for r in await conn.execute_fetchall("PRAGMA table_info(file_uploads)")}
         if "sheet_name" not in cols:
-            cur.execute("ALTER TABLE file_uploads ADD COLUMN sheet_name TEXT")
+            await conn.execute("ALTER TABLE file_uploads ADD COLUMN sheet_name TEXT")
         if "datasource_id" not in cols:
-            cur.execute("ALTER TABLE file_uploads ADD COLUMN datasource_id TEXT")
-            cur.execute("UPDATE file_uploads SET datasource_id='default' WHERE datasource_id IS NULL")
-        artifact_cols = {r["name"] for r in cur.execute("PRAGMA table_info(message_artifacts)").fetchall()}
+            await conn.execute("ALTER TABLE file_uploads ADD COLUMN datasource_id TEXT")
+            await conn.execute(
+                "UPDATE file_uploads SET datasource_id='default' WHERE datasource_id IS NULL"
+            )
+        artifact_cols = {
+            r["name"] for r in await conn.execute_fetchall("PRAGMA table_info(message_artifacts)")
+        }
         if "analysis_text" not in artifact_cols:
-            cur.execute("ALTER TABLE message_artifacts ADD COLUMN analysis_text TEXT")
+            await conn.execute("ALTER TABLE message_artifacts ADD COLUMN analysis_text TEXT")
         if "explain_text" not in artifact_cols:
-            cur.execute("ALTER TABLE message_artifacts ADD COLUMN explain_text TEXT")
+            await conn.execute("ALTER TABLE message_artifacts ADD COLUMN explain_text TEXT")
         if "suggest_text" not in artifact_cols:
-            cur.execute("ALTER TABLE message_artifacts ADD COLUMN suggest_text TEXT")
+            await conn.execute("ALTER TABLE message_artifacts ADD COLUMN suggest_text TEXT")
         if "safety_text" not in artifact_cols:
-            cur.execute("ALTER TABLE message_artifacts ADD COLUMN safety_text TEXT")
+            await conn.execute("ALTER TABLE message_artifacts ADD COLUMN safety_text TEXT")
         if "fix_text" not in artifact_cols:
-            cur.execute("ALTER TABLE message_artifacts ADD COLUMN fix_text TEXT")
+            await conn.execute("ALTER TABLE message_artifacts ADD COLUMN fix_text TEXT")
         if "view_json" not in artifact_cols:
-            cur.execute("ALTER TABLE message_artifacts ADD COLUMN view_json TEXT")
-        audit_cols = {r["name"] for r in cur.execute("PRAGMA table_info(sql_audits)").fetchall()}
+            await conn.execute("ALTER TABLE message_artifacts ADD COLUMN view_json TEXT")
+        if "rows_encoding" not in artifact_cols:
+            await conn.execute("ALTER TABLE message_artifacts ADD COLUMN rows_encoding TEXT")
+        audit_cols = {
+            r["name"] for r in await conn.execute_fetchall("PRAGMA table_info(sql_audits)")
+        }
         if audit_cols:
             if "elapsed_ms" not in audit_cols:
-                cur.execute("ALTER TABLE sql_audits ADD COLUMN elapsed_ms INTEGER")
+                await conn.execute("ALTER TABLE sql_audits ADD COLUMN elapsed_ms INTEGER")
             if "slow" not in audit_cols:
-                cur.execute("ALTER TABLE sql_audits ADD COLUMN slow INTEGER NOT NULL DEFAULT 0")
-        schema_cols = {r["name"] for r in cur.execute("PRAGMA table_info(schema_snapshots)").fetchall()}
+                await conn.execute(
+                    "ALTER TABLE sql_audits ADD COLUMN slow INTEGER NOT NULL DEFAULT 0"
+                )
+        schema_cols = {
+            r["name"] for r in await conn.execute_fetchall("PRAGMA table_info(schema_snapshots)")
+        }
         if schema_cols:
             if "checked_at" not in schema_cols:
-                cur.execute("ALTER TABLE schema_snapshots ADD COLUMN checked_at TEXT")
-        ds_cols = {r["name"] for r in cur.execute("PRAGMA table_info(data_sources)").fetchall()}
+                await conn.execute("ALTER TABLE schema_snapshots ADD COLUMN checked_at TEXT")
+        ds_cols = {
+            r["name"] for r in await conn.execute_fetchall("PRAGMA table_info(data_sources)")
+        }
         if "training_ok" not in ds_cols:
-            cur.execute("ALTER TABLE data_sources ADD COLUMN training_ok INTEGER")
+            await conn.execute("ALTER TABLE data_sources ADD COLUMN training_ok INTEGER")
         if "training_error" not in ds_cols:
-            cur.execute("ALTER TABLE data_sources ADD COLUMN training_error TEXT")
+            await conn.execute("ALTER TABLE data_sources ADD COLUMN training_error TEXT")
         if "last_trained_at" not in ds_cols:
-            cur.execute("ALTER TABLE data_sources ADD COLUMN last_trained_at TEXT")
-        conn.commit()
-        conn.close()
+            await conn.execute("ALTER TABLE data_sources ADD COLUMN last_trained_at TEXT")
+        await conn.commit()
 
 async def create_user(username: str, password_hash: str) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute(
+    async with _write_pool.connection() as conn:
+        await conn.execute(
             "INSERT INTO users(username, password_hash, created_at) VALUES(?,?,?)",
             (username, password_hash, datetime.utcnow().isoformat()),
         )
-        conn.commit()
-        conn.close()
+        await conn.commit()
 
 async def get_user(username: str) -> Optional[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        row = conn.execute("SELECT * FROM users WHERE username=?", (username,)).fetchone()
-        conn.close()
+    async with _pool.connection() as conn:
+        row = await _fetchone(conn, "SELECT * FROM users WHERE username=?", (username,))
         return dict(row) if row else None
 
-async def upsert_conversation(conv_id: str, owner_username: str, title: str | None = None) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute(
-            "INSERT OR IGNORE INTO conversations(id, owner_username, title, created_at) VALUES(?,?,?,?)",
+async def upsert_conversation(
+    conv_id: str, owner_username: str, title: str | None = None
+) -> dict[str, Any]:
+    """Create the conversation if missing (optionally setting its title) and return the row."""
+    async with _write_pool.connection() as conn:
+        row = await _fetchone(
+            conn,
+            "INSERT INTO conversations(id, owner_username, title, created_at) VALUES(?,?,?,?) "
+            "ON CONFLICT(id) DO UPDATE SET title=COALESCE(excluded.title, conversations.title) "
+            "RETURNING *",
             (conv_id, owner_username, title, datetime.utcnow().isoformat()),
         )
-        if title is not None:
-            conn.execute("UPDATE conversations SET title=? WHERE id=?", (title, conv_id))
-        conn.commit()
-        conn.close()
+        await conn.commit()
+        return dict(row)
 
 async def list_conversations(owner_username: str) -> List[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        rows = conn.execute(
+    async with _pool.connection() as conn:
+        rows = await conn.execute_fetchall(
             "SELECT * FROM conversations WHERE owner_username=? ORDER BY created_at DESC",
             (owner_username,),
-        ).fetchall()
-        conn.close()
+        )
         return [dict(r) for r in rows]
 
 async def add_file_upload(
@@ -226,9 +394,8 @@ async def add_file_upload(
     row_count: int,
     columns_json: str,
 ) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute(
+    await _writer.write(
+        (
             "INSERT INTO file_uploads(id, owner_username, datasource_id, filename, sheet_name, table_name, row_count, columns_json, created_at) "
             "VALUES(?,?,?,?,?,?,?,?,?)",
             (
@@ -243,143 +410,217 @@ async def add_file_upload(
                 datetime.utcnow().isoformat(),
             ),
         )
-        conn.commit()
-        conn.close()
+    )
 
 async def list_file_uploads(owner_username: str, datasource_id: str) -> List[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        rows = conn.execute(
+    async with _pool.connection() as conn:
+        rows = await conn.execute_fetchall(
             "SELECT * FROM file_uploads WHERE owner_username=? AND datasource_id=? ORDER BY created_at DESC",
             (owner_username, datasource_id),
-        ).fetchall()
-        conn.close()
+        )
         return [dict(r) for r in rows]
 
 async def get_file_upload(file_id: str) -> Optional[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        row = conn.execute("SELECT * FROM file_uploads WHERE id=?", (file_id,)).fetchone()
-        conn.close()
+    async with _pool.connection() as conn:
+        row = await _fetchone(conn, "SELECT * FROM file_uploads WHERE id=?", (file_id,))
         return dict(row) if row else None
 
 async def get_file_upload_by_table(
     owner_username: str, datasource_id: str, table_name: str
 ) -> Optional[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        row = conn.execute(
+    async with _pool.connection() as conn:
+        row = await _fetchone(
+            conn,
             "SELECT * FROM file_uploads WHERE owner_username=? AND datasource_id=? AND table_name=?",
             (owner_username, datasource_id, table_name),
-        ).fetchone()
-        conn.close()
+        )
         return dict(row) if row else None
 
 async def delete_file_upload(file_id: str) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute("DELETE FROM file_uploads WHERE id=?", (file_id,))
-        conn.commit()
-        conn.close()
+    async with _write_pool.connection() as conn:
+        await conn.execute("DELETE FROM file_uploads WHERE id=?", (file_id,))
+        await conn.commit()
 
 async def delete_file_uploads(file_ids: List[str]) -> None:
     if not file_ids:
         return
-    async with _lock:
-        conn = _connect()
+    async with _write_pool.connection() as conn:
         placeholders = ",".join(["?"] * len(file_ids))
-        conn.execute(f"DELETE FROM file_uploads WHERE id IN ({placeholders})", file_ids)
-        conn.commit()
-        conn.close()
+        await conn.execute(f"DELETE FROM file_uploads WHERE id IN ({placeholders})", file_ids)
+        await conn.commit()
 
 async def list_expired_file_uploads(ttl_hours: int) -> List[Dict[str, Any]]:
     if ttl_hours <= 0:
         return []
     cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
-    async with _lock:
-        conn = _connect()
-        rows = conn.execute(
+    async with _pool.connection() as conn:
+        rows = await conn.execute_fetchall(
             "SELECT * FROM file_uploads WHERE created_at < ? ORDER BY created_at ASC",
             (cutoff.isoformat(),),
-        ).fetchall()
-        conn.close()
+        )
         return [dict(r) for r in rows]
 
 async def get_conversation(conv_id: str) -> Optional[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        row = conn.execute("SELECT * FROM conversations WHERE id=?", (conv_id,)).fetchone()
-        conn.close()
+    async with _pool.connection() as conn:
+        row = await _fetchone(conn, "SELECT * FROM conversations WHERE id=?", (conv_id,))
         return dict(row) if row else None
 
 async def delete_conversation(conv_id: str) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute("DELETE FROM messages WHERE conversation_id=?", (conv_id,))
-        conn.execute("DELETE FROM message_artifacts WHERE conversation_id=?", (conv_id,))
-        conn.execute("DELETE FROM conversations WHERE id=?", (conv_id,))
-        conn.commit()
-        conn.close()
+    async with _write_pool.connection() as conn:
+        await conn.execute("DELETE FROM messages WHERE conversation_id=?", (conv_id,))
+        await conn.execute("DELETE FROM message_artifacts WHERE conversation_id=?", (conv_id,))
+        await conn.execute("DELETE FROM conversations WHERE id=?", (conv_id,))
+        await conn.commit()
+
+async def delete_conversation_if_owner(conv_id: str, owner_username: str) -> str | None:
+    """Delete the conversation only if ``owner_username`` owns it.
+
+    Returns the conversation's owner (None if it does not exist), so callers can tell
+    not-found from forbidden without a separate lookup.
+    """
+    async with _write_pool.connection() as conn:
+        row = await _fetchone(
+            conn, "SELECT owner_username FROM conversations WHERE id=?", (conv_id,)
+        )
+        if row is None or row["owner_username"] != owner_username:
+            return row["owner_username"] if row else None
+        await conn.execute("DELETE FROM messages WHERE conversation_id=?", (conv_id,))
+        await conn.execute("DELETE FROM message_artifacts WHERE conversation_id=?", (conv_id,))
+        await conn.execute("DELETE FROM conversations WHERE id=?", (conv_id,))
+        await conn.commit()
+        return owner_username
 
 async def add_message(conv_id: str, role: str, content: str) -> int:
-    async with _lock:
-        conn = _connect()
-        cur = conn.execute(
+    async with _write_pool.connection() as conn:
+        cur = await conn.execute(
             "INSERT INTO messages(conversation_id, role, content, created_at) VALUES(?,?,?,?)",
             (conv_id, role, content, datetime.utcnow().isoformat()),
         )
-        conn.commit()
+        await conn.commit()
         msg_id = int(cur.lastrowid)
-        conn.close()
         return msg_id
 
-async def get_messages(conv_id: str, limit: int = 30) -> List[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        rows = conn.execute(
-            "SELECT id, role, content, created_at FROM messages WHERE conversation_id=? "
-            "ORDER BY id DESC LIMIT ?",
-            (conv_id, limit),
-        ).fetchall()
-        conn.close()
+async def get_messages(
+    conv_id: str,
+    limit: int = 30,
+    roles: Sequence[str] | None = None,
+) -> list[dict[str, Any]]:
+    """Latest ``limit`` messages, oldest first.
+
+    With ``roles``, only those roles are returned, as ``{"role", "content"}`` dicts
+    ready to be used as LLM chat history.
+    """
+    async with _pool.connection() as conn:
+        if roles:
+            placeholders = ",".join(["?"] * len(roles))
+            rows = await conn.execute_fetchall(
+                "SELECT role, content FROM messages "
+                f"WHERE conversation_id=? AND role IN ({placeholders}) ORDER BY id DESC LIMIT ?",
+                (conv_id, *roles, limit),
+            )
+        else:
+            rows = await conn.execute_fetchall(
+                "SELECT id, role, content, created_at FROM messages WHERE conversation_id=? "
+                "ORDER BY id DESC LIMIT ?",
+                (conv_id, limit),
+            )
         # reverse to chronological
         return [dict(r) for r in reversed(rows)]
 
+async def get_messages_if_owner(
+    conv_id: str,
+    owner_username: str,
+    limit: int = 30,
+) -> tuple[str | None, list[dict[str, Any]]]:
+    """The conversation's owner (None if it does not exist) and, only when that owner
+    is ``owner_username``, its latest ``limit`` messages oldest first - in one query."""
+    async with _pool.connection() as conn:
+        rows = await conn.execute_fetchall(
+            "SELECT c.owner_username, m.id, m.role, m.content, m.created_at "
+            "FROM conversations c LEFT JOIN ("
+            "  SELECT id, role, content, created_at FROM messages WHERE conversation_id=? "
+            "  ORDER BY id DESC LIMIT ?"
+            ") m ON c.owner_username=? "
+            "WHERE c.id=? ORDER BY m.id DESC",
+            (conv_id, limit, owner_username, conv_id),
+        )
+    if not rows:
+        return None, []
+    messages = [
+        {"id": r["id"], "role": r["role"], "content": r["content"], "created_at": r["created_at"]}
+        for r in reversed(rows)
+        if r["id"] is not None
+    ]
+    return rows[0]["owner_username"], messages
+
 async def get_message_by_id(message_id: int) -> Optional[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        row = conn.execute(
+    async with _pool.connection() as conn:
+        row = await _fetchone(
+            conn,
             "SELECT id, conversation_id, role, content, created_at FROM messages WHERE id=?",
             (message_id,),
-        ).fetchone()
-        conn.close()
+        )
         return dict(row) if row else None
 
+_INSERT_ARTIFACT_SQL = (
+    "INSERT INTO message_artifacts(conversation_id, user_message_id, sql_text, columns_json, "
+    "rows_json, rows_encoding, chart_json, analysis_text, explain_text, suggest_text, "
+    "safety_text, fix_text, view_json, created_at) "
+    "VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?)"
+)
+# Result rows are the bulk of an artifact (up to MAX_ROWS x columns of JSON) and are
+# only read back when a conversation is reopened, so larger ones are stored deflated.
+# rows_encoding records how: NULL for plain JSON, "zlib" for compressed.
+_ROWS_COMPRESS_MIN_BYTES = 4096
+_ROWS_COMPRESS_LEVEL = 3
+
+
+def _encode_rows_json(rows_json: bytes | str) -> tuple[bytes | str, str | None]:
+    if len(rows_json) < _ROWS_COMPRESS_MIN_BYTES:
+        return rows_json, None
+    raw = rows_json.encode() if isinstance(rows_json, str) else rows_json
+    return zlib.compress(raw, _ROWS_COMPRESS_LEVEL), "zlib"
+
+
+def _artifact_from_row(row: sqlite3.Row) -> dict[str, Any]:
+    artifact = dict(row)
+    if artifact.pop("rows_encoding", None) == "zlib":
+        artifact["rows_json"] = zlib.decompress(artifact["rows_json"])
+    return artifact
+
+_INSERT_AUDIT_SQL = (
+    "INSERT INTO sql_audits(user_username, conversation_id, message_id, datasource_id, "
+    "sql_text, row_count, elapsed_ms, success, error_message, slow, created_at) "
+    "VALUES(?,?,?,?,?,?,?,?,?,?,?)"
+)
+_DEFAULT_TITLES = ("New Conversation", "新会话")
+
 async def add_message_artifact(
     conv_id: str,
     user_message_id: int,
     sql_text: str,
-    columns_json: str,
-    rows_json: str,
-    chart_json: str | None,
+    columns_json: bytes | str,
+    rows_json: bytes | str,
+    chart_json: bytes | str | None,
     analysis_text: str | None,
     explain_text: str | None = None,
     suggest_text: str | None = None,
     safety_text: str | None = None,
     fix_text: str | None = None,
-    view_json: str | None = None,
+    view_json: bytes | str | None = None,
 ) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute(
-            "INSERT INTO message_artifacts(conversation_id, user_message_id, sql_text, columns_json, rows_json, chart_json, analysis_text, explain_text, suggest_text, safety_text, fix_text, view_json, created_at) "
-            "VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?)",
+    # *_json values may be the raw orjson bytes: they are stored as-is (SQLite keeps
+    # them as BLOBs in the TEXT columns) and readers parse with orjson.loads, which
+    # accepts both, so nothing is decoded just to be stored.
+    async with _write_pool.connection() as conn:
+        await conn.execute(
+            _INSERT_ARTIFACT_SQL,
             (
                 conv_id,
                 user_message_id,
                 sql_text,
                 columns_json,
-                rows_json,
+                *_encode_rows_json(rows_json),
                 chart_json,
                 analysis_text,
                 explain_text,
@@ -390,18 +631,32 @@ async def add_message_artifact(
                 datetime.utcnow().isoformat(),
             ),
         )
-        conn.commit()
-        conn.close()
+        await conn.commit()
 
 async def get_message_artifact(conv_id: str, user_message_id: int) -> Optional[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        row = conn.execute(
+    async with _pool.connection() as conn:
+        row = await _fetchone(
+            conn,
             "SELECT * FROM message_artifacts WHERE conversation_id=? AND user_message_id=? ORDER BY id DESC LIMIT 1",
             (conv_id, user_message_id),
-        ).fetchone()
-        conn.close()
-        return dict(row) if row else None
+        )
+        return _artifact_from_row(row) if row else None
+
+async def get_message_artifacts(
+    conv_id: str, user_message_ids: list[int]
+) -> dict[int, dict[str, Any]]:
+    """Latest artifact per user message, for several messages in one query."""
+    if not user_message_ids:
+        return {}
+    placeholders = ",".join(["?"] * len(user_message_ids))
+    async with _pool.connection() as conn:
+        rows = await conn.execute_fetchall(
+            "SELECT * FROM message_artifacts "
+            f"WHERE conversation_id=? AND user_message_id IN ({placeholders}) ORDER BY id",
+            (conv_id, *user_message_ids),
+        )
+    # Ascending ids, so a later artifact for the same message overwrites an earlier one.
+    return {row["user_message_id"]: _artifact_from_row(row) for row in rows}
 
 async def add_sql_audit(
     *,
@@ -416,11 +671,9 @@ async def add_sql_audit(
     error_message: str | None,
     slow: bool,
 ) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute(
-            "INSERT INTO sql_audits(user_username, conversation_id, message_id, datasource_id, sql_text, row_count, elapsed_ms, success, error_message, slow, created_at) "
-            "VALUES(?,?,?,?,?,?,?,?,?,?,?)",
+    await _writer.write(
+        (
+            _INSERT_AUDIT_SQL,
             (
                 user_username,
                 conversation_id,
@@ -435,39 +688,33 @@ async def add_sql_audit(
                 datetime.utcnow().isoformat(),
             ),
         )
-        conn.commit()
-        conn.close()
+    )
 
 async def list_sql_audits(username: str, limit: int = 200) -> List[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        rows = conn.execute(
+    async with _pool.connection() as conn:
+        rows = await conn.execute_fetchall(
             "SELECT * FROM sql_audits WHERE user_username=? ORDER BY id DESC LIMIT ?",
             (username, limit),
-        ).fetchall()
-        conn.close()
+        )
         return [dict(r) for r in rows]
 
 async def get_schema_snapshot(datasource_id: str) -> Optional[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        row = conn.execute(
+    async with _pool.connection() as conn:
+        row = await _fetchone(
+            conn,
             "SELECT * FROM schema_snapshots WHERE datasource_id=?",
             (datasource_id,),
-        ).fetchone()
-        conn.close()
+        )
         return dict(row) if row else None
 
 async def set_schema_snapshot(datasource_id: str, schema_json: str) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute(
+    async with _write_pool.connection() as conn:
+        await conn.execute(
             "INSERT INTO schema_snapshots(datasource_id, schema_json, checked_at) VALUES(?,?,?) "
             "ON CONFLICT(datasource_id) DO UPDATE SET schema_json=excluded.schema_json, checked_at=excluded.checked_at",
             (datasource_id, schema_json, datetime.utcnow().isoformat()),
         )
-        conn.commit()
-        conn.close()
+        await conn.commit()
 
 async def add_schema_change_log(
     datasource_id: str,
@@ -475,9 +722,8 @@ async def add_schema_change_log(
     removed: List[str],
     changed: List[str],
 ) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute(
+    await _writer.write(
+        (
             "INSERT INTO schema_change_logs(datasource_id, added_json, removed_json, changed_json, created_at) "
             "VALUES(?,?,?,?,?)",
             (
@@ -488,17 +734,15 @@ async def add_schema_change_log(
                 datetime.utcnow().isoformat(),
             ),
         )
-        conn.commit()
-        conn.close()
+    )
 
 async def list_schema_change_logs(datasource_id: str, limit: int = 20) -> List[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        rows = conn.execute(
-            "SELECT * FROM schema_change_logs WHERE datasource_id=? ORDER BY id DESC LIMIT ?",
+    async with _pool.connection() as conn:
+        rows = await conn.execute_fetchall(
+            "SELECT added_json, removed_json, changed_json, created_at FROM schema_change_logs "
+            "WHERE datasource_id=? ORDER BY id DESC LIMIT ?",
             (datasource_id, limit),
-        ).fetchall()
-        conn.close()
+        )
         return [dict(r) for r in rows]
 
 async def add_datasource(
@@ -508,65 +752,51 @@ async def add_datasource(
     config_json: str,
     is_default: bool,
 ) -> None:
-    async with _lock:
-        conn = _connect()
-        if is_default:
-            conn.execute("UPDATE data_sources SET is_default=0")
-        conn.execute(
-            "INSERT INTO data_sources(id, name, type, config_json, is_default, created_at) "
-            "VALUES(?,?,?,?,?,?)",
-            (ds_id, name, ds_type, config_json, 1 if is_default else 0, datetime.utcnow().isoformat()),
-        )
-        conn.commit()
-        conn.close()
+    insert = (
+        "INSERT INTO data_sources(id, name, type, config_json, is_default, created_at) "
+        "VALUES(?,?,?,?,?,?)",
+        (ds_id, name, ds_type, config_json, 1 if is_default else 0, datetime.utcnow().isoformat()),
+    )
+    if is_default:
+        await _writer.write(("UPDATE data_sources SET is_default=0", ()), insert)
+    else:
+        await _writer.write(insert)
 
 async def list_datasources() -> List[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        rows = conn.execute("SELECT * FROM data_sources ORDER BY created_at DESC").fetchall()
-        conn.close()
+    async with _pool.connection() as conn:
+        rows = await conn.execute_fetchall("SELECT * FROM data_sources ORDER BY created_at DESC")
         return [dict(r) for r in rows]
 
 async def get_datasource(ds_id: str) -> Optional[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        row = conn.execute("SELECT * FROM data_sources WHERE id=?", (ds_id,)).fetchone()
-        conn.close()
+    async with _pool.connection() as conn:
+        row = await _fetchone(conn, "SELECT * FROM data_sources WHERE id=?", (ds_id,))
         return dict(row) if row else None
 
 async def get_default_datasource() -> Optional[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        row = conn.execute("SELECT * FROM data_sources WHERE is_default=1 LIMIT 1").fetchone()
-        conn.close()
+    async with _pool.connection() as conn:
+        row = await _fetchone(conn, "SELECT * FROM data_sources WHERE is_default=1 LIMIT 1")
         return dict(row) if row else None
 
 async def set_default_datasource(ds_id: str) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute("UPDATE data_sources SET is_default=0")
-        conn.execute("UPDATE data_sources SET is_default=1 WHERE id=?", (ds_id,))
-        conn.commit()
-        conn.close()
+    async with _write_pool.connection() as conn:
+        await conn.execute("UPDATE data_sources SET is_default=0")
+        await conn.execute("UPDATE data_sources SET is_default=1 WHERE id=?", (ds_id,))
+        await conn.commit()
 
 async def update_datasource_training(ds_id: str, ok: bool, error: str | None) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute(
+    async with _write_pool.connection() as conn:
+        await conn.execute(
             "UPDATE data_sources SET training_ok=?, training_error=?, last_trained_at=? WHERE id=?",
             (1 if ok else 0, error, datetime.utcnow().isoformat(), ds_id),
         )
-        conn.commit()
-        conn.close()
+        await conn.commit()
 
 async def list_table_scopes(owner_username: str, datasource_id: str) -> List[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        rows = conn.execute(
+    async with _pool.connection() as conn:
+        rows = await conn.execute_fetchall(
             "SELECT * FROM table_scopes WHERE owner_username=? AND datasource_id=? ORDER BY created_at DESC",
             (owner_username, datasource_id),
-        ).fetchall()
-        conn.close()
+        )
         return [dict(r) for r in rows]
 
 async def add_table_scope(
@@ -576,9 +806,8 @@ async def add_table_scope(
     name: str,
     tables_json: str,
 ) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute(
+    async with _write_pool.connection() as conn:
+        await conn.execute(
             "INSERT INTO table_scopes(id, owner_username, datasource_id, name, tables_json, created_at) "
             "VALUES(?,?,?,?,?,?)",
             (
@@ -590,37 +819,31 @@ async def add_table_scope(
                 datetime.utcnow().isoformat(),
             ),
         )
-        conn.commit()
-        conn.close()
+        await conn.commit()
 
 async def delete_table_scope(scope_id: str, owner_username: str) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute(
+    async with _write_pool.connection() as conn:
+        await conn.execute(
             "DELETE FROM table_scopes WHERE id=? AND owner_username=?",
             (scope_id, owner_username),
         )
-        conn.commit()
-        conn.close()
+        await conn.commit()
 
 async def list_qa_pairs(datasource_id: str) -> List[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        rows = conn.execute(
+    async with _pool.connection() as conn:
+        rows = await conn.execute_fetchall(
             "SELECT * FROM qa_pairs WHERE datasource_id=? ORDER BY created_at DESC",
             (datasource_id,),
-        ).fetchall()
-        conn.close()
+        )
         return [dict(r) for r in rows]
 
 async def get_qa_pair(qa_id: str) -> Optional[Dict[str, Any]]:
-    async with _lock:
-        conn = _connect()
-        row = conn.execute(
+    async with _pool.connection() as conn:
+        row = await _fetchone(
+            conn,
             "SELECT * FROM qa_pairs WHERE id=?",
             (qa_id,),
-        ).fetchone()
-        conn.close()
+        )
         return dict(row) if row else None
 
 async def add_qa_pair(
@@ -633,9 +856,8 @@ async def add_qa_pair(
     tags_json: str | None,
     enabled: bool,
 ) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute(
+    await _writer.write(
+        (
             "INSERT INTO qa_pairs(id, datasource_id, question, sql, note, tables_json, tags_json, enabled, created_at) "
             "VALUES(?,?,?,?,?,?,?,?,?)",
             (
@@ -650,8 +872,7 @@ async def add_qa_pair(
                 datetime.utcnow().isoformat(),
             ),
         )
-        conn.commit()
-        conn.close()
+    )
 
 async def update_qa_pair(
     qa_id: str,
@@ -662,9 +883,8 @@ async def update_qa_pair(
     tags_json: str | None,
     enabled: bool,
 ) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute(
+    async with _write_pool.connection() as conn:
+        await conn.execute(
             "UPDATE qa_pairs SET question=?, sql=?, note=?, tables_json=?, tags_json=?, enabled=? WHERE id=?",
             (
                 question,
@@ -676,12 +896,104 @@ async def update_qa_pair(
                 qa_id,
             ),
         )
-        conn.commit()
-        conn.close()
+        await conn.commit()
 
 async def delete_qa_pair(qa_id: str) -> None:
-    async with _lock:
-        conn = _connect()
-        conn.execute("DELETE FROM qa_pairs WHERE id=?", (qa_id,))
-        conn.commit()
-        conn.close()
+    async with _write_pool.connection() as conn:
+        await conn.execute("DELETE FROM qa_pairs WHERE id=?", (qa_id,))
+        await conn.commit()
+
+async def get_qa_pairs(qa_ids: list[str]) -> dict[str, dict[str, Any]]:
+    if not qa_ids:
+        return {}
+    placeholders = ",".join(["?"] * len(qa_ids))
+    async with _pool.connection() as conn:
+        rows = await conn.execute_fetchall(
+            f"SELECT * FROM qa_pairs WHERE id IN ({placeholders})", qa_ids
+        )
+    return {row["id"]: dict(row) for row in rows}
+
+async def set_qa_pairs_enabled(qa_ids: list[str], enabled: bool) -> None:
+    if not qa_ids:
+        return
+    placeholders = ",".join(["?"] * len(qa_ids))
+    async with _write_pool.connection() as conn:
+        await conn.execute(
+            f"UPDATE qa_pairs SET enabled=? WHERE id IN ({placeholders})",
+            (1 if enabled else 0, *qa_ids),
+        )
+        await conn.commit()
+
+async def delete_qa_pairs(qa_ids: list[str]) -> None:
+    if not qa_ids:
+        return
+    placeholders = ",".join(["?"] * len(qa_ids))
+    async with _write_pool.connection() as conn:
+        await conn.execute(f"DELETE FROM qa_pairs WHERE id IN ({placeholders})", qa_ids)
+        await conn.commit()
+
+async def finalize_chat_turn(
+    conv_id: str,
+    *,
+    title: str | None = None,
+    artifact: dict[str, Any] | None = None,
+    audit: dict[str, Any] | None = None,
+    assistant_content: str | None = None,
+) -> None:
+    """Persist the tail of a chat turn in a single transaction.
+
+    ``title`` only replaces an empty/default title. ``artifact`` and ``audit`` take the
+    keyword arguments of add_message_artifact / add_sql_audit (minus the conversation id).
+    """
+    if not title and artifact is None and audit is None and assistant_content is None:
+        return
+    now = datetime.utcnow().isoformat()
+    async with _write_pool.connection() as conn:
+        if title:
+            await conn.execute(
+                "UPDATE conversations SET title=? "
+                "WHERE id=? AND (title IS NULL OR TRIM(title) IN ('',?,?))",
+                (title, conv_id, *_DEFAULT_TITLES),
+            )
+        if artifact is not None:
+            await conn.execute(
+                _INSERT_ARTIFACT_SQL,
+                (
+                    conv_id,
+                    artifact["user_message_id"],
+                    artifact["sql_text"],
+                    artifact["columns_json"],
+                    *_encode_rows_json(artifact["rows_json"]),
+                    artifact.get("chart_json"),
+                    artifact.get("analysis_text"),
+                    artifact.get("explain_text"),
+                    artifact.get("suggest_text"),
+                    artifact.get("safety_text"),
+                    artifact.get("fix_text"),
+                    artifact.get("view_json"),
+                    now,
+                ),
+            )
+        if audit is not None:
+            await conn.execute(
+                _INSERT_AUDIT_SQL,
+                (
+                    audit["user_username"],
+                    conv_id,
+                    audit.get("message_id"),
+                    audit.get("datasource_id"),
+                    audit["sql_text"],
+                    audit.get("row_count"),
+                    audit.get("elapsed_ms"),
+                    1 if audit.get("success") else 0,
+                    audit.get("error_message"),
+                    1 if audit.get("slow") else 0,
+                    now,
+                ),
+            )
+        if assistant_content is not None:
+            await conn.execute(
+                "INSERT INTO messages(conversation_id, role, content, created_at) VALUES(?,?,?,?)",
+                (conv_id, "assistant", assistant_content, now),
+            )
+        await conn.commit()
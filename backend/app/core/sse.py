@@ -1,25 +1,84 @@
 from __future__ import annotations
 
-import json
-from typing import Any, AsyncGenerator, Dict, Optional
+import itertools
+import secrets
+from datetime import datetime
+from typing import Any, Callable
 
+import orjson
 
-def sse_event(event: str, data: Dict[str, Any] | str, event_id: Optional[str] = None) -> str:
+# Cached "event: <name>\ndata: " prefixes, keyed by event name.
+_PREFIXES: dict[str, bytes] = {}
+
+# Request ids only need to be unique per process lifetime: a random per-process prefix
+# plus a counter is cheaper than uuid4 and shorter on the wire (every event carries it).
+_ID_PREFIX = secrets.token_hex(4)
+_ID_COUNTER = itertools.count()
+
+
+def make_request_id() -> str:
+    return f"{_ID_PREFIX}{next(_ID_COUNTER):012x}"
+
+
+def _json_default(obj: Any):
+    if isinstance(obj, (datetime,)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def _event_prefix(event: str) -> bytes:
+    prefix = _PREFIXES.get(event)
+    if prefix is None:
+        prefix = _PREFIXES[event] = f"event: {event}\ndata: ".encode()
+    return prefix
+
+
+def sse_event(event: str, data: dict[str, Any] | str, event_id: str | None = None) -> bytes:
     if isinstance(data, str):
-        payload = data
+        payload = "\ndata: ".join(data.splitlines() or [""]).encode()
     else:
-        payload = json.dumps(data, ensure_ascii=False)
+        payload = orjson.dumps(data, default=_json_default)
 
-    lines = []
+    frame = _event_prefix(event) + payload + b"\n\n"
     if event_id is not None:
-        lines.append(f"id: {event_id}")
-    lines.append(f"event: {event}")
-    for chunk in payload.splitlines() or [""]:
-        lines.append(f"data: {chunk}")
-    lines.append("")  # end of message
-    return "\n".join(lines) + "\n"
+        frame = f"id: {event_id}\n".encode() + frame
+    return frame
+
+
+def sse_field_framer(event: str, field: str, extra: dict[str, Any]) -> Callable[[Any], bytes]:
+    """Return a framer for high-frequency events that differ only in ``field``.
+
+    ``extra`` is serialized once up front, so each call only encodes the new value.
+    """
+    head = _event_prefix(event) + b"{" + orjson.dumps(field) + b":"
+    rest = orjson.dumps(extra, default=_json_default)[1:]  # drop the leading "{"
+    tail = (b"," + rest if len(rest) > 1 else rest) + b"\n\n"
+
+    def frame(value: Any) -> bytes:
+        return head + orjson.dumps(value, default=_json_default) + tail
+
+    return frame
+
+
+# Byte templates for the fixed-shape status/done frames sent several times per request.
+# The request id is JSON-encoded once by the caller and spliced in; no dict, no dumps.
+_STATUS_HEADS: dict[str, bytes] = {}
+_DONE_HEADS = {
+    True: b'event: done\ndata: {"ok":true,"request_id":',
+    False: b'event: done\ndata: {"ok":false,"request_id":',
+}
+
+
+def status_frame(stage: str, request_id_json: bytes) -> bytes:
+    """Equivalent to sse_event("status", {"stage": stage, "request_id": request_id})."""
+    head = _STATUS_HEADS.get(stage)
+    if head is None:
+        head = b'event: status\ndata: {"stage":' + orjson.dumps(stage) + b',"request_id":'
+        _STATUS_HEADS[stage] = head
+    return head + request_id_json + b"}\n\n"
+
 
+def done_frame(ok: bool, request_id_json: bytes) -> bytes:
+    """Equivalent to sse_event("done", {"ok": ok, "request_id": request_id})."""
+    return _DONE_HEADS[ok] + request_id_json + b"}\n\n"
 
-async def sse_stream(generator: AsyncGenerator[str, None]) -> AsyncGenerator[bytes, None]:
-    async for msg in generator:
-        yield msg.encode("utf-8")
@@ -1,11 +1,57 @@
 from __future__ import annotations
 
-from typing import List
+import asyncio
+import logging
+import time
+from typing import Any
 
 from backend.app.core.config import settings
-from backend.app.core.mysql import drop_table
-from backend.app.core.sqlite_store import delete_file_uploads, list_expired_file_uploads, get_datasource
-import json
+from backend.app.core.datasources import datasource_config
+from backend.app.core.mysql import drop_table, list_tables
+from backend.app.core.sqlite_store import (
+    delete_file_uploads,
+    get_datasource,
+    list_expired_file_uploads,
+    list_file_uploads,
+)
+
+log = logging.getLogger("uploads")
+
+_cleanup_task: asyncio.Task | None = None
+_background: set[asyncio.Task] = set()
+_last_cleanup_ts = 0.0
+# Minimum spacing between on-demand cleanups triggered by schedule_cleanup().
+_CLEANUP_MIN_INTERVAL_S = 60.0
+# Queryable table names per (username, ds_id): (expires_at_monotonic, names).
+_ALLOWED_TABLES_TTL_S = 30.0
+_allowed_tables_cache: dict[tuple[str, str], tuple[float, frozenset[str]]] = {}
+
+
+def invalidate_available_tables(username: str | None = None, ds_id: str | None = None) -> None:
+    """Forget cached available_tables results for one user's datasource (or all of them)."""
+    if username is None or ds_id is None:
+        _allowed_tables_cache.clear()
+    else:
+        _allowed_tables_cache.pop((username, ds_id), None)
+
+
+async def available_tables(username: str, ds_id: str, ds_cfg: dict[str, Any]) -> frozenset[str]:
+    """Base tables (minus other users' tmp_ uploads) plus the user's own uploads, cached briefly."""
+    key = (username, ds_id)
+    now = time.monotonic()
+    cached = _allowed_tables_cache.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    base_tables, uploads = await asyncio.gather(
+        list_tables(ds_cfg, ds_id),
+        list_file_uploads(username, ds_id),
+    )
+    names = frozenset(
+        [n for t in base_tables if not (n := t["name"]).startswith("tmp_")]
+        + [u["table_name"] for u in uploads]
+    )
+    _allowed_tables_cache[key] = (now + _ALLOWED_TABLES_TTL_S, names)
+    return names
 
 
 async def cleanup_expired_uploads(ttl_hours: int | None = None) -> int:
@@ -23,10 +69,54 @@ async def cleanup_expired_uploads(ttl_hours: int | None = None) -> int:
             ds = await get_datasource(ds_id)
             if not ds:
                 continue
-            cfg = json.loads(ds["config_json"])
+            cfg = datasource_config(ds)
             await drop_table(meta["table_name"], cfg, ds_id)
         except Exception:
             pass
 
     await delete_file_uploads([m["id"] for m in expired])
+    invalidate_available_tables()
     return len(expired)
+
+
+async def _run_cleanup() -> None:
+    global _last_cleanup_ts
+    _last_cleanup_ts = time.monotonic()
+    try:
+        await cleanup_expired_uploads()
+    except Exception:
+        log.exception("upload cleanup failed")
+
+
+async def _cleanup_loop(interval_s: int) -> None:
+    while True:
+        await _run_cleanup()
+        await asyncio.sleep(interval_s)
+
+
+def start_cleanup_loop() -> None:
+    """Run cleanup_expired_uploads now and then every FILE_UPLOAD_CLEANUP_INTERVAL_SECONDS."""
+    global _cleanup_task
+    if _cleanup_task is None or _cleanup_task.done():
+        interval_s = max(1, settings.FILE_UPLOAD_CLEANUP_INTERVAL_SECONDS)
+        _cleanup_task = asyncio.create_task(_cleanup_loop(interval_s))
+
+
+async def stop_cleanup_loop() -> None:
+    global _cleanup_task
+    task, _cleanup_task = _cleanup_task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def schedule_cleanup() -> None:
+    """Fire-and-forget cleanup, at most once per _CLEANUP_MIN_INTERVAL_S."""
+    if time.monotonic() - _last_cleanup_ts < _CLEANUP_MIN_INTERVAL_S:
+        return
+    task = asyncio.create_task(_run_cleanup())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
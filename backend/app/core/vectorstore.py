@@ -11,11 +11,21 @@ import chromadb
 from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
 
 from backend.app.core.config import settings
-from backend.app.core.llm import OpenAICompatEmbeddingClient, get_embed_client
+from backend.app.core.llm import OpenAICompatEmbeddingClient, close_http_client, get_embed_client
 
 log = logging.getLogger("vectorstore")
 
 
+async def _embed_in_fresh_loop(
+    client: OpenAICompatEmbeddingClient, texts: list[str]
+) -> list[list[float]]:
+    # The loop is discarded by asyncio.run afterwards; close its pooled HTTP client with it.
+    try:
+        return await client.embed(texts)
+    finally:
+        await close_http_client()
+
+
 class RemoteEmbeddingFunction(EmbeddingFunction):
     def __init__(self, embed_client: OpenAICompatEmbeddingClient):
         self._client = embed_client
@@ -30,9 +40,11 @@ class RemoteEmbeddingFunction(EmbeddingFunction):
             from concurrent.futures import ThreadPoolExecutor
 
             with ThreadPoolExecutor(max_workers=1) as ex:
-                return ex.submit(lambda: asyncio.run(self._client.embed(list(input)))).result()
+                texts = list(input)
+                job = ex.submit(lambda: asyncio.run(_embed_in_fresh_loop(self._client, texts)))
+                return job.result()
         except RuntimeError:
-            return asyncio.run(self._client.embed(list(input)))
+            return asyncio.run(_embed_in_fresh_loop(self._client, list(input)))
 
 
 class LocalHashEmbeddingFunction(EmbeddingFunction):
@@ -98,6 +110,10 @@ class ResilientEmbeddingFunction(EmbeddingFunction):
             return self._fallback(input)
 
 
+def _qa_doc_id(qa_id: str) -> str:
+    return qa_id if qa_id.startswith("qa::") else f"qa::{qa_id}"
+
+
 class SchemaVectorStore:
     def __init__(self, collection_suffix: str | None = None):
         os.makedirs(settings.CHROMA_PERSIST_DIR, exist_ok=True)
@@ -176,17 +192,20 @@ class SchemaVectorStore:
                 return
             raise
 
+    def replace_qa_docs(self, qa_ids: list[str], docs: list[dict[str, Any]]) -> None:
+        """Make the store hold exactly ``docs`` for ``qa_ids``.
+
+        Upsert already overwrites a document with the same id, so only ids without a
+        replacement doc need a delete: at most one call of each kind.
+        """
+        kept = {d["id"] for d in docs}
+        self.delete_qa_docs([q for q in qa_ids if q and _qa_doc_id(q) not in kept])
+        self.upsert_qa_docs(docs)
+
     def delete_qa_docs(self, qa_ids: List[str]) -> None:
         if not qa_ids:
             return
-        ids = []
-        for qid in qa_ids:
-            if not qid:
-                continue
-            if qid.startswith("qa::"):
-                ids.append(qid)
-            else:
-                ids.append(f"qa::{qid}")
+        ids = [_qa_doc_id(qid) for qid in qa_ids if qid]
         try:
             self._collection.delete(ids=ids)
         except Exception as e:
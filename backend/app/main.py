@@ -7,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from backend.app.core.config import settings
 from backend.app.core.logging import setup_logging
+from backend.app.core.responses import ORJSONResponse
 from backend.app.api.health import router as health_router
 from backend.app.api.auth import router as auth_router
 from backend.app.api.conversations import router as conv_router
@@ -15,19 +16,20 @@ from backend.app.api.schema import router as schema_router
 from backend.app.api.files import router as files_router
 from backend.app.api.datasources import router as datasources_router
 from backend.app.api.export import router as export_router
-from backend.app.api.sql import router as sql_router
+from backend.app.api.sql import router as sql_router, drain_background_writes
 from backend.app.api.audits import router as audits_router
 from backend.app.api.scopes import router as scopes_router
 from backend.app.api.qa import router as qa_router
-from backend.app.core.sqlite_store import init_sqlite
+from backend.app.core.sqlite_store import init_sqlite, close_sqlite
 from backend.app.core.mysql import close_engine
-from backend.app.core.uploads import cleanup_expired_uploads
+from backend.app.core.llm import close_http_client
+from backend.app.core.uploads import start_cleanup_loop, stop_cleanup_loop
 from backend.app.core.datasources import ensure_default_datasource
 from backend.app.core.schema_monitor import run_schema_check
 
 setup_logging()
 
-app = FastAPI(title=settings.APP_NAME)
+app = FastAPI(title=settings.APP_NAME, default_response_class=ORJSONResponse)
 
 # CORS (adjust for production)
 app.add_middleware(
@@ -61,10 +63,14 @@ async def _startup() -> None:
     # init sqlite for user + conversation store
     await init_sqlite()
     await ensure_default_datasource()
-    await cleanup_expired_uploads()
+    start_cleanup_loop()
     await run_schema_check()
 
 
 @app.on_event("shutdown")
 async def _shutdown() -> None:
+    await stop_cleanup_loop()
+    await drain_background_writes()
     await close_engine()
+    await close_http_client()
+    await close_sqlite()
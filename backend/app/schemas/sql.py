@@ -7,6 +7,8 @@ class SqlExecuteRequest(BaseModel):
     message_id: int
     sql: str
     with_analysis: bool = True
+    with_suggest: bool = True
+    with_chart: bool = True
     view: dict | None = None
     allowed_tables: Optional[List[str]] = None
     table_lock: bool = False
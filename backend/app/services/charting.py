@@ -1,20 +1,32 @@
 from __future__ import annotations
 
 from datetime import datetime
+from itertools import zip_longest
+from collections.abc import Sequence
 from typing import Any, Dict, List, Optional
 import numbers
 import re
 
+_DATE_PREFIX_RE = re.compile(r"^\d{4}[-/]\d{2}[-/]\d{2}")
+# Filler for cells missing from short rows when transposing.
+_MISSING = object()
+# isinstance() against the numbers.Real ABC is slow; result sets only hold a few types.
+_NUMBER_TYPES: dict[type, bool] = {}
+
 
 def _is_number(x: Any) -> bool:
-    return isinstance(x, numbers.Real) and not isinstance(x, bool)
+    t = type(x)
+    hit = _NUMBER_TYPES.get(t)
+    if hit is None:
+        hit = _NUMBER_TYPES[t] = issubclass(t, numbers.Real) and not issubclass(t, bool)
+    return hit
 
 
 def _is_date_like(value: Any) -> bool:
     if isinstance(value, datetime):
         return True
     if isinstance(value, str):
-        if re.match(r"^\d{4}[-/]\d{2}[-/]\d{2}", value):
+        if _DATE_PREFIX_RE.match(value):
             return True
         try:
             datetime.fromisoformat(value.replace("Z", "+00:00"))
@@ -24,19 +36,21 @@ def _is_date_like(value: Any) -> bool:
     return False
 
 
-def _summarize_columns(columns: List[str], rows: List[List[Any]]) -> List[Dict[str, Any]]:
-    sample = rows[:500]
+def _transpose(rows: list[list[Any]]) -> list[Sequence[Any]]:
+    """Column-major view of ``rows``; cells absent from short rows are ``_MISSING``."""
+    return list(zip_longest(*rows, fillvalue=_MISSING))
+
+
+def _summarize_columns(columns: list[str], col_values: list[Sequence[Any]]) -> list[dict[str, Any]]:
     summaries: List[Dict[str, Any]] = []
     for idx, col in enumerate(columns):
+        values = col_values[idx] if idx < len(col_values) else ()
         non_null = 0
         num_count = 0
         date_count = 0
         uniques: set[Any] = set()
-        for r in sample:
-            if idx >= len(r):
-                continue
-            v = r[idx]
-            if v is None:
+        for v in values:
+            if v is None or v is _MISSING:
                 continue
             non_null += 1
             if _is_number(v):
@@ -60,18 +74,12 @@ def _summarize_columns(columns: List[str], rows: List[List[Any]]) -> List[Dict[s
     return summaries
 
 
-def _ordered_values(rows: List[List[Any]], idx: int) -> List[Any]:
-    seen = set()
-    ordered = []
-    for r in rows:
-        if idx >= len(r):
-            continue
-        v = r[idx]
-        if v not in seen:
-            seen.add(v)
-            ordered.append(v)
-    return ordered
-
+def _ordered_values(col_values: list[Sequence[Any]], idx: int) -> list[Any]:
+    values = col_values[idx] if idx < len(col_values) else ()
+    # dict preserves first-seen order, so this is an order-preserving dedupe.
+    ordered = dict.fromkeys(values)
+    ordered.pop(_MISSING, None)
+    return list(ordered)
 
 
 def suggest_echarts_option(columns: List[str], rows: List[List[Any]]) -> Optional[Dict[str, Any]]:
@@ -80,7 +88,8 @@ def suggest_echarts_option(columns: List[str], rows: List[List[Any]]) -> Optiona
         return None
 
     sample = rows[:300]
-    summaries = _summarize_columns(columns, sample)
+    col_values = _transpose(sample)
+    summaries = _summarize_columns(columns, col_values)
 
     numeric_cols = [s for s in summaries if s["numeric_ratio"] >= 0.8]
     date_cols = [s for s in summaries if s["date_ratio"] >= 0.6]
@@ -116,7 +125,7 @@ def suggest_echarts_option(columns: List[str], rows: List[List[Any]]) -> Optiona
 
     dim_idx = dim["index"]
     dim_name = columns[dim_idx]
-    dim_values = _ordered_values(sample, dim_idx)
+    dim_values = _ordered_values(col_values, dim_idx)
 
     if dim in date_cols:
         metric_cols = metrics[:3]
@@ -34,7 +34,7 @@ async def explain_sql(sql: str) -> str:
         {"role": "user", "content": sql},
     ]
     try:
-        content = await client.chat(messages, temperature=0.2)
+        content = await client.chat(messages, temperature=0.2, cache=True)
         return (content or "").strip()
     except Exception:
         return ""
@@ -56,7 +56,7 @@ async def suggest_sql_improvement(question: str, sql: str, row_count: int | None
         {"role": "user", "content": f"Question: {question}\nSQL: {sql}\nStats: {stats}"},
     ]
     try:
-        content = await client.chat(messages, temperature=0.2)
+        content = await client.chat(messages, temperature=0.2, cache=True)
         return (content or "").strip()
     except Exception:
         return ""
@@ -81,5 +81,6 @@ async def generate_sql(
     content = await client.chat(
         build_messages(question, schema_context, history, allowed_tables=allowed_tables, table_lock=table_lock),
         temperature=settings.LLM_TEMPERATURE,
+        cache=True,
     )
     return _extract_sql(content)
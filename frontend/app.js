@@ -2474,6 +2474,7 @@ async function sendMessage() {
   const reader = resp.body.getReader();
   const decoder = new TextDecoder("utf-8");
   let buffer = "";
+  let pendingTable = null;
 
   const onEvent = (eventName, data) => {
     if (eventName === "message") {
@@ -2497,8 +2498,15 @@ async function sendMessage() {
       setSqlAssist({ safety: data.tips || [] });
     } else if (eventName === "sql_fix") {
       setSqlAssist({ fix: data.text || "" });
-    } else if (eventName === "table") {
-      renderTable(data.columns, data.rows);
+    } else if (eventName === "table_schema") {
+      pendingTable = { columns: data.columns || [], rows: [] };
+    } else if (eventName === "table_rows") {
+      if (pendingTable && Array.isArray(data.rows)) {
+        for (const row of data.rows) pendingTable.rows.push(row);
+      }
+    } else if (eventName === "table_done") {
+      if (pendingTable) renderTable(pendingTable.columns, pendingTable.rows);
+      pendingTable = null;
     } else if (eventName === "chart") {
       if (!chart) chart = echarts.init(el("chart"));
       chart.clear();